@@ -0,0 +1,76 @@
+"""Benchmark syncing N offline mood entries: N single POST /api/mood calls vs POST /api/mood/batch.
+
+Goes through the full app (auth, aggregates, insights invalidation) with FastAPI's TestClient,
+so it measures server-side cost per entry without network latency; on a real connection every
+single-entry call also pays a round trip. Uses a throwaway SQLite database unless
+--database-url is given. Run from the server directory:
+
+    python -m benchmarks.bench_mood_batch --entries 500 --notes
+"""
+import argparse
+import os
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+MOODS = ["happy", "calm", "stressed", "exhausted", "sad"]
+MAX_BATCH = 500
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Single-entry vs batch mood sync")
+    parser.add_argument("--entries", type=int, default=500)
+    parser.add_argument("--database-url", help="Defaults to a temporary SQLite database")
+    parser.add_argument("--notes", action="store_true", help="Give every entry a note, so each one also queues an indexing job")
+    args = parser.parse_args()
+
+    # Configure before the app reads config
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    os.environ["ADMISSION_CONTROL_ENABLED"] = "false"
+    from fastapi.testclient import TestClient
+    import main as app_main
+
+    client = TestClient(app_main.app)
+    username = f"bench-{uuid.uuid4().hex[:8]}"
+    client.post("/api/register", json={"username": username, "password": "bench", "email": f"{username}@bench.test"})
+    token = client.post("/api/token", data={"username": username, "password": "bench"}).json()["access_token"]
+    client.headers["Authorization"] = f"Bearer {token}"
+
+    start = datetime(2026, 1, 5, 8, 0)
+    entries = [
+        {
+            "client_id": uuid.uuid4().hex,
+            "mood": MOODS[i % len(MOODS)],
+            "timestamp": (start + timedelta(hours=3 * i)).isoformat(),
+            "note": f"Nota {i}: clase con el grupo {i % 7}" if args.notes else None,
+        }
+        for i in range(args.entries)
+    ]
+
+    started = time.perf_counter()
+    for item in entries:
+        client.post("/api/mood", json={"mood": item["mood"], "note": item["note"]}).raise_for_status()
+    single = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for i in range(0, len(entries), MAX_BATCH):
+        client.post("/api/mood/batch", json={"entries": entries[i:i + MAX_BATCH]}).raise_for_status()
+    batch = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for i in range(0, len(entries), MAX_BATCH):
+        result = client.post("/api/mood/batch", json={"entries": entries[i:i + MAX_BATCH]}).json()
+        assert result["created"] == 0
+    retry = time.perf_counter() - started
+
+    requests = -(-args.entries // MAX_BATCH)
+    print(f"{args.entries} entries{' with notes' if args.notes else ''} on {os.environ['DATABASE_URL'].split(':')[0]}")
+    print(f"  single POST /api/mood:  {single * 1000:9.1f} ms  ({args.entries} requests, {single / args.entries * 1000:.2f} ms/entry)")
+    print(f"  POST /api/mood/batch:   {batch * 1000:9.1f} ms  ({requests} requests, {batch / args.entries * 1000:.2f} ms/entry)")
+    print(f"  batch retry (no-op):    {retry * 1000:9.1f} ms")
+    print(f"  speedup:                {single / batch:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""Benchmark compute_insights against an equivalent pure-Python implementation.
+
+Times only the aggregation step; the single ORM query in load_mood_arrays is not included.
+Run from the server directory:
+
+    python -m benchmarks.bench_mood_insights --entries 30000
+"""
+import argparse
+import math
+import random
+import time
+from collections import defaultdict
+import numpy as np
+from services.mood_insights import (
+    MOOD_CATEGORIES,
+    MOOD_CODES,
+    MOOD_SCORES,
+    WEEKDAYS,
+    TIME_OF_DAY,
+    DAY,
+    WEEK,
+    MOVING_AVERAGE_DAYS,
+    DAILY_HISTORY_DAYS,
+    compute_insights,
+    _epoch_to_date,
+)
+
+SCORES = [float(s) for s in MOOD_SCORES]
+STRESS = {MOOD_CODES["stressed"], MOOD_CODES["exhausted"]}
+
+
+def synthetic_history(entries: int, seed: int = 7) -> tuple[list[int], list[int]]:
+    """Sorted (codes, epoch seconds): a few entries a day over the years needed to fit `entries`."""
+    rng = random.Random(seed)
+    start = 1_600_000_000
+    span = max(entries // 4, 1) * DAY
+    epochs = sorted(start + rng.randrange(span) for _ in range(entries))
+    codes = [rng.choices(range(len(MOOD_CATEGORIES)), weights=[4, 3, 3, 2, 2, 1])[0] for _ in range(entries)]
+    return codes, epochs
+
+
+def _group(keys, size, scores, stress):
+    counts, score_sums, stress_sums = [0] * size, [0.0] * size, [0] * size
+    for key, score, is_stress in zip(keys, scores, stress):
+        counts[key] += 1
+        score_sums[key] += score
+        stress_sums[key] += is_stress
+    return [
+        (n, score_sums[i] / max(n, 1), stress_sums[i] / max(n, 1))
+        for i, n in enumerate(counts)
+    ]
+
+
+def python_insights(codes: list[int], epochs: list[int], tz_offset_minutes: int = 0) -> dict:
+    """Loop-based equivalent of compute_insights, as it would be written without NumPy."""
+    total = len(codes)
+    distribution = [0] * len(MOOD_CATEGORIES)
+    for code in codes:
+        distribution[code] += 1
+    result = {
+        "total_entries": total,
+        "distribution": dict(zip(MOOD_CATEGORIES, distribution)),
+        "average_score": None,
+        "weekly": [],
+        "daily_moving_average": [],
+        "stress_streaks": {"current": 0, "longest": 0},
+        "by_weekday": [],
+        "by_time_of_day": [],
+    }
+    if not total:
+        return result
+
+    local = [e + tz_offset_minutes * 60 for e in epochs]
+    scores = [SCORES[c] for c in codes]
+    stress = [c in STRESS for c in codes]
+    result["average_score"] = round(sum(scores) / total, 3)
+
+    weeks = defaultdict(lambda: [0, 0.0, 0])
+    for t, score, is_stress in zip(local, scores, stress):
+        week = weeks[(t + 3 * DAY) // WEEK]
+        week[0] += 1
+        week[1] += score
+        week[2] += is_stress
+    result["weekly"] = [
+        {
+            "week_start": _epoch_to_date(week * WEEK - 3 * DAY),
+            "entries": n,
+            "average_score": round(score_sum / n, 3),
+            "stress_ratio": round(stress_sum / n, 3),
+        }
+        for week, (n, score_sum, stress_sum) in sorted(weeks.items())
+    ]
+
+    days = [t // DAY for t in local]
+    first_day = days[0]
+    span = days[-1] - first_day + 1
+    day_counts, day_sums = [0] * span, [0.0] * span
+    for day, score in zip(days, scores):
+        day_counts[day - first_day] += 1
+        day_sums[day - first_day] += score
+    daily = []
+    for i in range(max(span - DAILY_HISTORY_DAYS, 0), span):
+        window = range(max(i - MOVING_AVERAGE_DAYS + 1, 0), i + 1)
+        window_count = sum(day_counts[j] for j in window)
+        window_sum = sum(day_sums[j] for j in window)
+        daily.append({
+            "date": _epoch_to_date((first_day + i) * DAY),
+            "entries": day_counts[i],
+            "average_score": round(day_sums[i] / day_counts[i], 3) if day_counts[i] else None,
+            "moving_average": round(window_sum / window_count, 3) if window_count else None,
+        })
+    result["daily_moving_average"] = daily
+
+    current = longest = 0
+    for is_stress in stress:
+        current = current + 1 if is_stress else 0
+        longest = max(longest, current)
+    result["stress_streaks"] = {"current": current, "longest": longest}
+
+    weekday = [(day + 3) % 7 for day in days]
+    result["by_weekday"] = [
+        {"bucket": name, "entries": n, "average_score": round(avg, 3), "stress_ratio": round(ratio, 3)}
+        for name, (n, avg, ratio) in zip(WEEKDAYS, _group(weekday, 7, scores, stress))
+    ]
+
+    def time_bucket(t):
+        hour = (t % DAY) // 3600
+        return next(i for i, (_, first, last) in enumerate(TIME_OF_DAY) if first <= hour < last)
+
+    buckets = [time_bucket(t) for t in local]
+    result["by_time_of_day"] = [
+        {"bucket": name, "entries": n, "average_score": round(avg, 3), "stress_ratio": round(ratio, 3)}
+        for (name, _, _), (n, avg, ratio) in zip(TIME_OF_DAY, _group(buckets, len(TIME_OF_DAY), scores, stress))
+    ]
+    return result
+
+
+def assert_close(a, b, path="result"):
+    """Both implementations must agree; floats may differ in the last rounded digit."""
+    if isinstance(a, dict):
+        assert a.keys() == b.keys(), path
+        for key in a:
+            assert_close(a[key], b[key], f"{path}.{key}")
+    elif isinstance(a, list):
+        assert len(a) == len(b), path
+        for i, (x, y) in enumerate(zip(a, b)):
+            assert_close(x, y, f"{path}[{i}]")
+    elif isinstance(a, float) and isinstance(b, float):
+        assert math.isclose(a, b, abs_tol=1e-3), f"{path}: {a} != {b}"
+    else:
+        assert a == b, f"{path}: {a!r} != {b!r}"
+
+
+def best_of(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="compute_insights vs pure Python")
+    parser.add_argument("--entries", type=int, default=30000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--tz-offset-minutes", type=int, default=-300)
+    args = parser.parse_args()
+
+    codes, epochs = synthetic_history(args.entries)
+    code_array = np.array(codes, dtype=np.int8)
+    epoch_array = np.array(epochs, dtype=np.int64)
+
+    assert_close(
+        compute_insights(code_array, epoch_array, args.tz_offset_minutes),
+        python_insights(codes, epochs, args.tz_offset_minutes),
+    )
+
+    numpy_seconds = best_of(lambda: compute_insights(code_array, epoch_array, args.tz_offset_minutes), args.repeat)
+    python_seconds = best_of(lambda: python_insights(codes, epochs, args.tz_offset_minutes), args.repeat)
+    print(f"{args.entries} entries, best of {args.repeat}")
+    print(f"  numpy:       {numpy_seconds * 1000:8.2f} ms")
+    print(f"  pure python: {python_seconds * 1000:8.2f} ms")
+    print(f"  speedup:     {python_seconds / numpy_seconds:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Load test for AdmissionControlMiddleware: goodput with and without it under overload.
+
+The stub backend serves /api/chat with a fixed capacity (a semaphore standing in for the
+DB pool / Gemini quota) and service time. Requests arrive at a fixed rate above that
+capacity; one request in the middle is a distress message. A response counts towards
+goodput only when it arrives within the client deadline. Everything runs in-process over
+httpx's ASGI transport. Run from the server directory:
+
+    ADMISSION_MAX_WAIT_SECONDS=0.5 python -m benchmarks.load_admission
+"""
+import argparse
+import asyncio
+import time
+import httpx
+from fastapi import FastAPI, Request
+from middleware.admission import AdmissionControlMiddleware, admission_stats
+
+DISTRESS_MESSAGE = "estoy muy estresada, tuve un mal día"
+
+
+def stub_backend(capacity: int, service_time: float, admission: bool) -> FastAPI:
+    app = FastAPI()
+    backend = asyncio.Semaphore(capacity)
+
+    @app.post("/api/chat")
+    async def chat(request: Request):
+        body = await request.json()
+        async with backend:
+            await asyncio.sleep(service_time)
+        return {"response": body["message"]}
+
+    if admission:
+        app.add_middleware(AdmissionControlMiddleware)
+    return app
+
+
+async def offer_load(app: FastAPI, requests: int, rate: float, deadline: float) -> dict:
+    counts = {"good": 0, "late": 0, "shed": 0}
+    distress = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=None) as client:
+        async def one(i: int):
+            is_distress = i == requests // 2
+            started = time.perf_counter()
+            response = await client.post("/api/chat", json={"message": DISTRESS_MESSAGE if is_distress else "hola"})
+            elapsed = time.perf_counter() - started
+            if response.status_code == 503:
+                counts["shed"] += 1
+            elif elapsed <= deadline:
+                counts["good"] += 1
+            else:
+                counts["late"] += 1
+            if is_distress:
+                distress.update(status=response.status_code, seconds=round(elapsed, 2))
+
+        started = time.perf_counter()
+        tasks = []
+        for i in range(requests):
+            tasks.append(asyncio.create_task(one(i)))
+            await asyncio.sleep(1 / rate)
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+    return {**counts, "goodput_per_s": round(counts["good"] / elapsed, 1), "distress": distress}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Goodput under overload, with and without admission control")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--rates", type=float, nargs="+", default=[60, 120, 200, 400], help="Offered requests per second")
+    parser.add_argument("--capacity", type=int, default=8, help="Concurrent requests the backend serves")
+    parser.add_argument("--service-time", type=float, default=0.1, help="Seconds per request")
+    parser.add_argument("--deadline", type=float, default=1.0, help="Client deadline in seconds")
+    args = parser.parse_args()
+
+    print(f"Backend capacity {args.capacity / args.service_time:.0f} req/s, deadline {args.deadline}s, {args.requests} requests per run")
+    print(f"{'offered/s':>9} {'admission':>9} {'goodput/s':>9} {'good':>5} {'late':>5} {'shed':>5}  distress")
+    for rate in args.rates:
+        for admission in (False, True):
+            app = stub_backend(args.capacity, args.service_time, admission)
+            r = asyncio.run(offer_load(app, args.requests, rate, args.deadline))
+            print(
+                f"{rate:>9.0f} {'on' if admission else 'off':>9} {r['goodput_per_s']:>9} "
+                f"{r['good']:>5} {r['late']:>5} {r['shed']:>5}  {r['distress']['status']} in {r['distress']['seconds']}s"
+            )
+    print(f"chat limiter: {admission_stats()['chat']}")
+
+
+if __name__ == "__main__":
+    main()
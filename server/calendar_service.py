@@ -3,6 +3,8 @@ from googleapiclient.discovery import build
 from sqlalchemy.orm import Session
 from models.user import UserDB
 from config import GOOGLE_CLIENT_ID, GOOGLE_CLIENT_SECRET
+from database import SessionLocal
+from services.job_queue import register_job
 import datetime
 
 def get_calendar_service(user: UserDB):
@@ -51,3 +53,26 @@ def create_event(user: UserDB, summary: str, start_time: str, end_time: str, des
 
     event = service.events().insert(calendarId='primary', body=event).execute()
     return event.get('htmlLink')
+
+
+@register_job("calendar.create_event")
+def create_event_job(payload: dict):
+    """Background job: create a calendar event for a user."""
+    db = SessionLocal()
+    try:
+        user = db.query(UserDB).filter(UserDB.id == payload["user_id"]).first()
+        if not user:
+            raise ValueError(f"User {payload['user_id']} not found")
+        link = create_event(
+            user,
+            payload["summary"],
+            payload["start_time"],
+            payload["end_time"],
+            payload.get("description"),
+        )
+    finally:
+        db.close()
+    if not link:
+        # Not retryable: the user has not connected Google Calendar
+        return {"created": False, "error": "User is not logged in with Google or has not granted calendar permissions."}
+    return {"created": True, "link": link}
@@ -10,6 +10,12 @@ DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://user:password@db:5432/bie
 SECRET_KEY = os.getenv("SECRET_KEY", "super_secret_key_change_in_prod")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 1 day
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))  # Verified JWT claims kept in memory
+# How long a cached token is trusted before the revoked_tokens table is checked again
+REVOCATION_CHECK_TTL_SECONDS = float(os.getenv("REVOCATION_CHECK_TTL_SECONDS", "5"))
+
+# Admins (comma separated emails)
+ADMIN_EMAILS = [e.strip().lower() for e in os.getenv("ADMIN_EMAILS", "").split(",") if e.strip()]
 
 # Google OAuth
 GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID", "your-client-id")
@@ -18,6 +24,50 @@ GOOGLE_REDIRECT_URI = os.getenv("GOOGLE_REDIRECT_URI", "http://localhost:8000/au
 
 # Google AI
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+CHAT_MAX_TOOL_ITERATIONS = int(os.getenv("CHAT_MAX_TOOL_ITERATIONS", "4"))  # Function-call rounds per chat message
+
+# Personal chat context (per-user vector index over mood notes and chat turns)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "auto")  # auto, gemini, hashing (local, deterministic)
+VECTOR_INDEX_DIR = os.getenv("VECTOR_INDEX_DIR", "vector_index")
+CHAT_CONTEXT_SNIPPETS = int(os.getenv("CHAT_CONTEXT_SNIPPETS", "4"))
+CHAT_CONTEXT_MAX_CHARS = int(os.getenv("CHAT_CONTEXT_MAX_CHARS", "300"))  # Per snippet
 
 # Frontend
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost")
+
+# Background jobs
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_POLL_INTERVAL_SECONDS = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "1.0"))
+JOB_VISIBILITY_TIMEOUT_SECONDS = int(os.getenv("JOB_VISIBILITY_TIMEOUT_SECONDS", "60"))
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "2.0"))
+JOB_RETRY_MAX_SECONDS = float(os.getenv("JOB_RETRY_MAX_SECONDS", "300.0"))
+JOB_RETENTION_DAYS = int(os.getenv("JOB_RETENTION_DAYS", "7"))  # Finished jobs (and their payloads) are deleted after this
+
+# School-wide wellbeing dashboard
+WELLBEING_K_ANONYMITY = int(os.getenv("WELLBEING_K_ANONYMITY", "5"))
+# Per-user contributor rows are deleted for buckets older than this; later entries for those buckets
+# (offline sync) no longer raise their contributor counts
+WELLBEING_CONTRIBUTOR_RETENTION_DAYS = int(os.getenv("WELLBEING_CONTRIBUTOR_RETENTION_DAYS", "30"))
+
+# Admission control (per route class concurrency limits)
+ADMISSION_CONTROL_ENABLED = os.getenv("ADMISSION_CONTROL_ENABLED", "true").lower() == "true"
+ADMISSION_CHAT_LIMIT = int(os.getenv("ADMISSION_CHAT_LIMIT", "8"))
+ADMISSION_CHAT_RESERVED = int(os.getenv("ADMISSION_CHAT_RESERVED", "2"))  # Slots only distress messages may use
+ADMISSION_AUTH_LIMIT = int(os.getenv("ADMISSION_AUTH_LIMIT", "8"))
+ADMISSION_DEFAULT_LIMIT = int(os.getenv("ADMISSION_DEFAULT_LIMIT", "32"))
+ADMISSION_QUEUE_FACTOR = int(os.getenv("ADMISSION_QUEUE_FACTOR", "2"))  # Queue size = limit * factor
+ADMISSION_MAX_WAIT_SECONDS = float(os.getenv("ADMISSION_MAX_WAIT_SECONDS", "5.0"))
+ADMISSION_RETRY_AFTER_SECONDS = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "2"))
+
+# mood_entries monthly range partitioning (PostgreSQL only)
+MOOD_PARTITIONING = os.getenv("MOOD_PARTITIONING", "false").lower() == "true"
+MOOD_PARTITION_MONTHS_AHEAD = int(os.getenv("MOOD_PARTITION_MONTHS_AHEAD", "3"))
+MOOD_INSIGHTS_HISTORY_DAYS = int(os.getenv("MOOD_INSIGHTS_HISTORY_DAYS", "365"))  # 0 reads all history
+
+# Request profiling (middleware only installed when enabled)
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN")  # Requests sending it in X-Profile-Token are profiled
+PROFILING_MAX_RECORDS = int(os.getenv("PROFILING_MAX_RECORDS", "50"))
+PROFILING_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILING_SAMPLE_INTERVAL_MS", "5"))
+# Each profiled request runs a sampler thread; requests beyond this many run unprofiled
+PROFILING_MAX_CONCURRENT = int(os.getenv("PROFILING_MAX_CONCURRENT", "2"))
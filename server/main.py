@@ -2,18 +2,31 @@ from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
+from datetime import datetime, timedelta
 
 # Database
-from database import engine, Base
+from database import engine, Base, add_missing_columns
 from models.user import UserDB
 from models.community import CommunityPostDB
 from models.mood import MoodEntryDB
+from models.job import JobDB
+from models.wellbeing import MoodBucketDB, MoodBucketContributorDB
 
 # Routers
 from routers.auth import router as auth_router, google_router
 from routers.chat import router as chat_router
 from routers.community import router as community_router
 from routers.mood import router as mood_router
+from routers.jobs import router as jobs_router
+from routers.admin import router as admin_router
+
+# Background jobs (importing calendar_service registers its handlers)
+import calendar_service
+from services.job_queue import job_pool, schedule_job_pruning
+from services.mood_partitions import setup_partitioned_mood_entries, schedule_partition_maintenance
+from services.mood_insights import invalidate_mood_insights
+from services.wellbeing_aggregates import record_mood_entry, get_wellbeing_dashboard, schedule_contributor_pruning
+from services.vector_index import index_mood_note
 
 # MCP
 from mcp.server import Server
@@ -23,14 +36,18 @@ import mcp.types as types
 
 load_dotenv()
 
-# Create tables
+# Create tables (a partitioned mood_entries must exist before create_all runs)
+setup_partitioned_mood_entries(engine)
 Base.metadata.create_all(bind=engine)
+add_missing_columns(engine)
 
 # Initialize FastAPI app
 app = FastAPI(title="Bienestar Docente API")
 
 # CORS settings
-from config import FRONTEND_URL
+from config import FRONTEND_URL, ADMISSION_CONTROL_ENABLED, PROFILING_ENABLED
+from middleware.admission import AdmissionControlMiddleware
+from middleware.profiling import ProfilingMiddleware
 
 def clean_url(url):
     if not url: return None
@@ -48,6 +65,14 @@ origins = [
 if cleaned_frontend_url:
     origins.append(cleaned_frontend_url)
 
+# Request profiling (innermost, so it measures the app rather than queueing)
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
+# Admission control (added before CORS so CORS wraps its 503 responses)
+if ADMISSION_CONTROL_ENABLED:
+    app.add_middleware(AdmissionControlMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -63,6 +88,23 @@ app.include_router(google_router)
 app.include_router(chat_router)
 app.include_router(community_router)
 app.include_router(mood_router)
+app.include_router(jobs_router)
+app.include_router(admin_router)
+
+
+@app.on_event("startup")
+async def start_job_workers():
+    """Start the background job workers."""
+    schedule_partition_maintenance()
+    schedule_job_pruning()
+    schedule_contributor_pruning()
+    job_pool.start()
+
+
+@app.on_event("shutdown")
+async def stop_job_workers():
+    """Stop the background job workers."""
+    await job_pool.stop()
 
 
 @app.get("/")
@@ -158,6 +200,16 @@ async def handle_list_tools() -> list[types.Tool]:
                 "type": "object",
                 "properties": {},
             }
+        ),
+        types.Tool(
+            name="get_school_wellbeing",
+            description="Get the anonymized school-wide daily mood summary. Small groups are suppressed.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "days": {"type": "integer", "description": "Number of past days to include (default 7, max 31)"}
+                },
+            }
         )
     ]
 
@@ -182,13 +234,34 @@ async def handle_call_tool(
 
             db_entry = MoodEntryDB(mood=mood, note=note, user_id=user_id)
             db.add(db_entry)
+            db.flush()
+            record_mood_entry(db, user_id, db_entry.mood, db_entry.timestamp)
+            if user_id:
+                index_mood_note(db, user_id, db_entry.id, db_entry.mood, db_entry.note, db_entry.timestamp)
             db.commit()
+            if user_id:
+                invalidate_mood_insights(user_id)
             return [types.TextContent(type="text", text=f"Mood '{mood}' logged successfully.")]
 
         elif name == "get_latest_posts":
             posts = db.query(CommunityPostDB).order_by(CommunityPostDB.id.desc()).limit(5).all()
             text = "\n".join([f"- {p.author}: {p.content}" for p in posts])
             return [types.TextContent(type="text", text=f"Latest posts:\n{text}")]
+
+        elif name == "get_school_wellbeing":
+            days = min(max(int((arguments or {}).get("days") or 7), 1), 31)
+            end = datetime.utcnow()
+            dashboard = get_wellbeing_dashboard(db, "day", end - timedelta(days=days), end)
+            lines = []
+            for bucket in dashboard["buckets"]:
+                day = bucket["bucket_start"].date().isoformat()
+                if bucket["suppressed"]:
+                    lines.append(f"- {day}: (suppressed, fewer than {dashboard['k_anonymity']} teachers)")
+                else:
+                    moods = ", ".join(f"{m}: {c}" for m, c in bucket["moods"].items())
+                    lines.append(f"- {day}: {bucket['entries']} entries from {bucket['contributors']} teachers ({moods})")
+            text = "\n".join(lines) or "No data"
+            return [types.TextContent(type="text", text=f"School wellbeing (last {days} days):\n{text}")]
             
         else:
             raise ValueError(f"Unknown tool: {name}")
@@ -0,0 +1,232 @@
+import asyncio
+import json
+from collections import deque
+from typing import Optional
+from starlette.responses import JSONResponse
+from services.ai_service import is_distress_message
+from config import (
+    ADMISSION_CHAT_LIMIT,
+    ADMISSION_CHAT_RESERVED,
+    ADMISSION_AUTH_LIMIT,
+    ADMISSION_DEFAULT_LIMIT,
+    ADMISSION_QUEUE_FACTOR,
+    ADMISSION_MAX_WAIT_SECONDS,
+    ADMISSION_RETRY_AFTER_SECONDS,
+)
+
+# Long-lived or trivial paths that never take a slot
+EXEMPT_PATHS = {"/", "/sse"}
+MAX_CLASSIFIED_BODY = 64 * 1024
+
+
+class _Waiter:
+    __slots__ = ("priority", "future")
+
+    def __init__(self, priority: bool, future: asyncio.Future):
+        self.priority = priority
+        self.future = future
+
+
+class AdmissionLimiter:
+    """Concurrency limit with a bounded FIFO queue, a wait deadline and slots reserved for priority requests."""
+
+    def __init__(
+        self,
+        name: str,
+        limit: int,
+        reserved: int = 0,
+        queue_size: int = 0,
+        priority_queue_size: int = 0,
+        max_wait: float = ADMISSION_MAX_WAIT_SECONDS,
+    ):
+        self.name = name
+        self.limit = limit
+        self.reserved = min(reserved, limit - 1) if limit > 1 else 0
+        self.queue_size = queue_size
+        self.priority_queue_size = priority_queue_size
+        self.max_wait = max_wait
+        self.active = 0
+        self._waiters: deque[_Waiter] = deque()
+        self.admitted = 0
+        self.admitted_priority = 0
+        self.demoted_priority = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+
+    def _has_capacity(self, priority: bool) -> bool:
+        return self.active < (self.limit if priority else self.limit - self.reserved)
+
+    def _queued(self, priority: bool) -> int:
+        return sum(1 for w in self._waiters if w.priority == priority)
+
+    def _grant(self, priority: bool):
+        self.active += 1
+        self.admitted += 1
+        if priority:
+            self.admitted_priority += 1
+
+    async def acquire(self, priority: bool = False) -> bool:
+        """Take a slot, waiting up to max_wait. Returns False when the request should be shed."""
+        # Priority is granted by keywords and easy to claim, so once its own queue is full
+        # a priority request waits like any other
+        if priority and not self._has_capacity(True) and self._queued(True) >= self.priority_queue_size:
+            priority = False
+            self.demoted_priority += 1
+        # Priority requests only wait behind other priority requests
+        if self._has_capacity(priority) and not (self._queued(True) if priority else self._waiters):
+            self._grant(priority)
+            return True
+        if not priority and self._queued(False) >= self.queue_size:
+            self.rejected_queue_full += 1
+            return False
+
+        waiter = _Waiter(priority, asyncio.get_running_loop().create_future())
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout=self.max_wait)
+            return True
+        except asyncio.TimeoutError:
+            if self._abandon(waiter):
+                return True
+            self.rejected_timeout += 1
+            return False
+        except asyncio.CancelledError:
+            if self._abandon(waiter):
+                self.release()
+            raise
+
+    def _abandon(self, waiter: _Waiter) -> bool:
+        """Drop a waiter from the queue. Returns True if it was granted a slot meanwhile."""
+        if waiter.future.done():
+            return True
+        self._waiters.remove(waiter)
+        waiter.future.cancel()
+        return False
+
+    def release(self):
+        """Free a slot and hand it to the next waiter, priority first."""
+        self.active -= 1
+        while self._waiters:
+            waiter = next((w for w in self._waiters if w.priority), None)
+            if waiter is None or not self._has_capacity(True):
+                waiter = self._waiters[0] if self._has_capacity(False) else None
+            if waiter is None:
+                return
+            self._waiters.remove(waiter)
+            self._grant(waiter.priority)
+            waiter.future.set_result(True)
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "reserved": self.reserved,
+            "queue_size": self.queue_size,
+            "priority_queue_size": self.priority_queue_size,
+            "active": self.active,
+            "queued": len(self._waiters),
+            "admitted": self.admitted,
+            "admitted_priority": self.admitted_priority,
+            "demoted_priority": self.demoted_priority,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+        }
+
+
+def _limiter(name: str, limit: int, reserved: int = 0) -> AdmissionLimiter:
+    return AdmissionLimiter(
+        name,
+        limit,
+        reserved,
+        queue_size=limit * ADMISSION_QUEUE_FACTOR,
+        priority_queue_size=reserved * ADMISSION_QUEUE_FACTOR,
+    )
+
+
+limiters = {
+    "chat": _limiter("chat", ADMISSION_CHAT_LIMIT, ADMISSION_CHAT_RESERVED),
+    "auth": _limiter("auth", ADMISSION_AUTH_LIMIT),
+    "default": _limiter("default", ADMISSION_DEFAULT_LIMIT),
+}
+
+
+def route_class(path: str) -> Optional[str]:
+    """Map a request path to its limiter, or None when exempt."""
+    if path in EXEMPT_PATHS:
+        return None
+    if path == "/api/chat":
+        return "chat"
+    if path in ("/api/token", "/api/register") or path.startswith("/auth/"):
+        return "auth"
+    return "default"
+
+
+async def _read_body(receive, limit: int = MAX_CLASSIFIED_BODY) -> tuple[list, Optional[bytes]]:
+    """Buffer the request body up to `limit` bytes. Returns the messages read and the body,
+    or None as the body when it is larger (the rest is left unread for the app)."""
+    messages, body = [], b""
+    while True:
+        message = await receive()
+        messages.append(message)
+        if message["type"] != "http.request":
+            return messages, body
+        body += message.get("body", b"")
+        if len(body) > limit:
+            return messages, None
+        if not message.get("more_body", False):
+            return messages, body
+
+
+def _is_distress_request(body: Optional[bytes]) -> bool:
+    if body is None:
+        return False
+    try:
+        message = json.loads(body).get("message")
+    except (ValueError, AttributeError):
+        return False
+    return isinstance(message, str) and is_distress_message(message)
+
+
+class AdmissionControlMiddleware:
+    """Sheds load with a fast 503 + Retry-After once a route class is saturated."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+        name = route_class(scope["path"])
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+
+        priority = False
+        if name == "chat" and scope["method"] == "POST":
+            # Buffer (a bounded prefix of) the body to classify it, then replay it downstream
+            messages, body = await _read_body(receive)
+            priority = _is_distress_request(body)
+            original_receive = receive
+
+            async def receive():
+                if messages:
+                    return messages.pop(0)
+                return await original_receive()
+
+        limiter = limiters[name]
+        if not await limiter.acquire(priority):
+            response = JSONResponse(
+                status_code=503,
+                content={"detail": "Service temporarily overloaded, please retry shortly"},
+                headers={"Retry-After": str(ADMISSION_RETRY_AFTER_SECONDS)},
+            )
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
+
+
+def admission_stats() -> dict:
+    return {name: limiter.stats() for name, limiter in limiters.items()}
@@ -0,0 +1,192 @@
+import asyncio
+import hmac
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import event
+from database import engine
+from config import (
+    PROFILING_TOKEN,
+    PROFILING_MAX_RECORDS,
+    PROFILING_SAMPLE_INTERVAL_MS,
+    PROFILING_MAX_CONCURRENT,
+)
+
+PROFILE_HEADER = b"x-profile-token"
+# Leaf frames of threads parked waiting for work (blocked in C calls), not doing it
+IDLE_MODULES = ("threading.py", "selectors.py", "queue.py")
+IDLE_LEAVES = {("thread.py", "_worker"), ("_asyncio.py", "run")}  # concurrent.futures and anyio workers
+
+
+class ProfilingState:
+    """Runtime toggle set from the admin endpoint: profile a fraction of requests under a path prefix."""
+
+    def __init__(self):
+        self.enabled = False
+        self.sample_rate = 0.0
+        self.path_prefix = "/"
+
+    def as_dict(self) -> dict:
+        return {"enabled": self.enabled, "sample_rate": self.sample_rate, "path_prefix": self.path_prefix}
+
+
+state = ProfilingState()
+records: "deque[dict]" = deque(maxlen=PROFILING_MAX_RECORDS)
+
+_current_sql: ContextVar[Optional[list]] = ContextVar("profiling_sql", default=None)
+_active = 0
+_active_lock = threading.Lock()
+
+
+# --- SQL capture: listeners are attached only while a profiled request is running ---
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_sql.get() is not None:
+        conn.info.setdefault("profiling_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    statements = _current_sql.get()
+    if statements is None:
+        return
+    started = conn.info.get("profiling_started")
+    duration = (time.perf_counter() - started.pop()) * 1000 if started else None
+    statements.append({"statement": statement, "duration_ms": duration, "executemany": executemany})
+
+
+def _try_attach() -> bool:
+    """Take one of the PROFILING_MAX_CONCURRENT profiling slots. Returns False when all are taken."""
+    global _active
+    with _active_lock:
+        if _active >= PROFILING_MAX_CONCURRENT:
+            return False
+        _active += 1
+        if _active == 1:
+            event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        return True
+
+
+def _detach():
+    global _active
+    with _active_lock:
+        _active -= 1
+        if _active == 0:
+            event.remove(engine, "before_cursor_execute", _before_cursor_execute)
+            event.remove(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# --- Sampling profiler ---
+
+class StackSampler(threading.Thread):
+    """Samples the stacks of all busy threads into folded (flame graph) format.
+
+    Python threads cannot be attributed to a request, so work from concurrent requests
+    may show up in the same profile.
+    """
+
+    def __init__(self, interval: float):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        own = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            self.samples += 1
+            for ident, frame in sys._current_frames().items():
+                module = os.path.basename(frame.f_code.co_filename)
+                if ident == own or module in IDLE_MODULES or (module, frame.f_code.co_name) in IDLE_LEAVES:
+                    continue
+                names = []
+                while frame is not None:
+                    names.append(f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_name}")
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(names))] += 1
+
+    def stop(self) -> str:
+        self._stop_event.set()
+        self.join()
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+
+def _should_profile(scope) -> bool:
+    if PROFILING_TOKEN:
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                return hmac.compare_digest(value, PROFILING_TOKEN.encode())
+    return state.enabled and scope["path"].startswith(state.path_prefix) and random.random() < state.sample_rate
+
+
+class ProfilingMiddleware:
+    """Profiles requests carrying X-Profile-Token, or a sampled fraction when enabled by an admin.
+
+    Only installed when PROFILING_ENABLED is set, so it costs nothing otherwise. At most
+    PROFILING_MAX_CONCURRENT requests are profiled at once; the rest run unprofiled.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _should_profile(scope) or not _try_attach():
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex
+        status = {"code": None}
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message = {**message, "headers": list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]}
+            await send(message)
+
+        statements: list = []
+        token = _current_sql.set(statements)
+        sampler = StackSampler(PROFILING_SAMPLE_INTERVAL_MS / 1000)
+        started_at = datetime.utcnow()
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            duration = (time.perf_counter() - started) * 1000
+            # Joining the sampler can wait a whole sample interval; keep it off the event loop
+            folded = await asyncio.to_thread(sampler.stop)
+            _detach()
+            _current_sql.reset(token)
+            records.append({
+                "id": profile_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status["code"],
+                "started_at": started_at.isoformat(),
+                "duration_ms": duration,
+                "samples": sampler.samples,
+                "sql_count": len(statements),
+                "sql_ms": sum(s["duration_ms"] or 0 for s in statements),
+                "sql": statements,
+                "folded_stacks": folded,
+            })
+
+
+def list_profiles() -> list[dict]:
+    """Summaries of stored profiles, newest first."""
+    return [
+        {k: v for k, v in record.items() if k not in ("sql", "folded_stacks")}
+        for record in reversed(records)
+    ]
+
+
+def get_profile(profile_id: str) -> Optional[dict]:
+    return next((record for record in records if record["id"] == profile_id), None)
@@ -2,5 +2,7 @@
 from .user import UserDB
 from .mood import MoodEntryDB
 from .community import CommunityPostDB
+from .job import JobDB
+from .wellbeing import MoodBucketDB, MoodBucketContributorDB
 
-__all__ = ["UserDB", "MoodEntryDB", "CommunityPostDB"]
+__all__ = ["UserDB", "MoodEntryDB", "CommunityPostDB", "JobDB", "MoodBucketDB", "MoodBucketContributorDB"]
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from database import Base
+from datetime import datetime
+
+
+class JobDB(Base):
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, index=True)
+    payload = Column(Text)  # JSON encoded arguments for the handler
+    idempotency_key = Column(String, unique=True, index=True, nullable=True)
+    status = Column(String, index=True, default="pending")  # pending, running, succeeded, failed
+    attempts = Column(Integer, default=0)
+    max_attempts = Column(Integer, default=5)
+    run_after = Column(DateTime, default=datetime.utcnow, index=True)
+    locked_until = Column(DateTime, nullable=True)  # Visibility timeout while running
+    lease = Column(Integer, default=0)  # Incremented on every claim, never reset; only the holder may renew or finish
+    result = Column(Text, nullable=True)  # JSON encoded handler result
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
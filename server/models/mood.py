@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index
 from database import Base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -6,11 +6,17 @@ from datetime import datetime
 
 class MoodEntryDB(Base):
     __tablename__ = "mood_entries"
+    __table_args__ = (
+        # Offline clients send their own ids so retried syncs do not create duplicates
+        Index("uq_mood_entries_user_client", "user_id", "client_id", unique=True),
+        Index("ix_mood_entries_user_timestamp", "user_id", "timestamp"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     mood = Column(String, index=True)
     note = Column(Text, nullable=True)
     timestamp = Column(DateTime, default=datetime.utcnow)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    client_id = Column(String, nullable=True)
 
     owner = relationship("UserDB", back_populates="moods")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Integer, String, DateTime
 from database import Base
 from sqlalchemy.orm import relationship
 
@@ -14,6 +14,14 @@ class UserDB(Base):
     google_access_token = Column(String, nullable=True)
     google_refresh_token = Column(String, nullable=True)
     avatar_url = Column(String, nullable=True)
+    tokens_valid_after = Column(Integer, nullable=True)  # Epoch second; tokens issued earlier are revoked
 
     posts = relationship("CommunityPostDB", back_populates="owner")
     moods = relationship("MoodEntryDB", back_populates="owner")
+
+
+class RevokedTokenDB(Base):
+    __tablename__ = "revoked_tokens"
+
+    digest = Column(String, primary_key=True)  # SHA-256 of the token, never the token itself
+    expires_at = Column(DateTime, index=True)  # The token's exp; the row is useless afterwards
@@ -0,0 +1,30 @@
+from sqlalchemy import Boolean, Column, Integer, String, DateTime, UniqueConstraint
+from database import Base
+
+
+class MoodBucketDB(Base):
+    """School-wide mood counts per time bucket. mood '*' holds the bucket total."""
+    __tablename__ = "mood_buckets"
+    __table_args__ = (UniqueConstraint("granularity", "bucket_start", "mood", name="uq_mood_bucket"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    granularity = Column(String, index=True)  # hour, day
+    bucket_start = Column(DateTime, index=True)
+    mood = Column(String)
+    entry_count = Column(Integer, default=0)
+    contributor_count = Column(Integer, default=0)  # Distinct users, used for k-anonymity
+    contributors_pruned = Column(Boolean, default=False)  # Contributor rows deleted; the count is frozen
+
+
+class MoodBucketContributorDB(Base):
+    """Which users already contributed to a bucket cell, so contributor counts stay distinct."""
+    __tablename__ = "mood_bucket_contributors"
+    __table_args__ = (
+        UniqueConstraint("granularity", "bucket_start", "mood", "user_id", name="uq_mood_bucket_contributor"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    granularity = Column(String)
+    bucket_start = Column(DateTime)
+    mood = Column(String)
+    user_id = Column(Integer)
@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.orm import Session
+from database import get_db
+from models.user import UserDB
+from schemas.wellbeing import WellbeingDashboardResponse, WellbeingRebuildResponse
+from schemas.profiling import ProfilingSettings
+from services.auth_service import get_current_admin
+from services.token_cache import token_cache
+from middleware.admission import admission_stats
+from middleware import profiling
+from config import PROFILING_ENABLED
+from services.wellbeing_aggregates import GRANULARITIES, get_wellbeing_dashboard, rebuild_mood_buckets
+from services.vector_index import enqueue_index_rebuild
+
+router = APIRouter(prefix="/api/admin", tags=["admin"])
+
+MAX_BUCKETS = 24 * 31
+
+
+@router.get("/wellbeing", response_model=WellbeingDashboardResponse)
+def get_wellbeing(
+    granularity: str = "day",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+    admin: UserDB = Depends(get_current_admin),
+):
+    """Anonymized school-wide mood dashboard (last 30 days by default)."""
+    if granularity not in GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"granularity must be one of: {', '.join(GRANULARITIES)}")
+    end = end or datetime.utcnow()
+    start = start or end - timedelta(days=30)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    if (end - start) / GRANULARITIES[granularity] > MAX_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"Range too large: at most {MAX_BUCKETS} buckets")
+    return get_wellbeing_dashboard(db, granularity, start, end)
+
+
+@router.post("/wellbeing/rebuild", response_model=WellbeingRebuildResponse)
+def rebuild_wellbeing(db: Session = Depends(get_db), admin: UserDB = Depends(get_current_admin)):
+    """Recompute wellbeing buckets from raw mood entries. Archived months are left as they are."""
+    buckets, since = rebuild_mood_buckets(db)
+    return {"buckets": buckets, "rebuilt_from": since}
+
+
+@router.post("/vector-index/rebuild")
+def rebuild_vector_index(db: Session = Depends(get_db), admin: UserDB = Depends(get_current_admin)):
+    """Queue a rebuild of every user's personal index from their mood notes (e.g. after a redeploy)."""
+    return {"job_ids": enqueue_index_rebuild(db)}
+
+
+@router.get("/token-cache")
+def get_token_cache_stats(admin: UserDB = Depends(get_current_admin)):
+    """JWT verification cache hit rate and CPU saved."""
+    return token_cache.stats()
+
+
+@router.get("/admission")
+def get_admission_stats(admin: UserDB = Depends(get_current_admin)):
+    """Concurrency, queue and shed counts per route class."""
+    return admission_stats()
+
+
+@router.get("/profiling", response_model=ProfilingSettings)
+def get_profiling_settings(admin: UserDB = Depends(get_current_admin)):
+    """Current request sampling settings."""
+    return profiling.state.as_dict()
+
+
+@router.put("/profiling", response_model=ProfilingSettings)
+def update_profiling_settings(settings: ProfilingSettings, admin: UserDB = Depends(get_current_admin)):
+    """Profile a fraction of requests under a path prefix."""
+    if not PROFILING_ENABLED:
+        raise HTTPException(status_code=409, detail="Profiling middleware is not installed (set PROFILING_ENABLED=true)")
+    profiling.state.enabled = settings.enabled
+    profiling.state.sample_rate = settings.sample_rate
+    profiling.state.path_prefix = settings.path_prefix
+    return profiling.state.as_dict()
+
+
+@router.get("/profiles")
+def list_profiles(admin: UserDB = Depends(get_current_admin)):
+    """Stored request profiles, newest first."""
+    return profiling.list_profiles()
+
+
+@router.get("/profiles/{profile_id}")
+def get_profile(profile_id: str, admin: UserDB = Depends(get_current_admin)):
+    """A profile with the SQL statements it executed."""
+    record = profiling.get_profile(profile_id)
+    if not record:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return {k: v for k, v in record.items() if k != "folded_stacks"}
+
+
+@router.get("/profiles/{profile_id}/flamegraph", response_class=PlainTextResponse)
+def download_flamegraph(profile_id: str, admin: UserDB = Depends(get_current_admin)):
+    """Folded stacks, for flamegraph.pl or speedscope."""
+    record = profiling.get_profile(profile_id)
+    if not record:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(
+        record["folded_stacks"],
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.folded"'},
+    )
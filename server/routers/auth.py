@@ -5,13 +5,16 @@ from fastapi.responses import RedirectResponse
 from sqlalchemy.orm import Session
 from database import get_db
 from models.user import UserDB
-from schemas.user import UserCreate, UserResponse, Token
+from schemas.user import UserCreate, UserResponse, Token, PasswordChange
 from services.auth_service import (
     get_password_hash,
     verify_password,
     create_access_token,
+    token_subject,
     get_current_user,
+    oauth2_scheme,
 )
+from services.token_cache import token_cache
 from google_auth import google_sso
 from config import ACCESS_TOKEN_EXPIRE_MINUTES, FRONTEND_URL
 
@@ -54,7 +57,46 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.username if user.username else user.email}, expires_delta=access_token_expires
+        data={"sub": token_subject(user)}, expires_delta=access_token_expires
+    )
+    return {"access_token": access_token, "token_type": "bearer"}
+
+
+@router.post("/logout")
+def logout(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db),
+    current_user: UserDB = Depends(get_current_user),
+):
+    """Revoke the current access token."""
+    exp = token_cache.decode(token).get("exp")
+    token_cache.revoke_token(token, exp, db)
+    db.commit()
+    return {"detail": "Logged out"}
+
+
+@router.put("/users/me/password", response_model=Token)
+def change_password(
+    change: PasswordChange,
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db),
+    current_user: UserDB = Depends(get_current_user),
+):
+    """Change the password, sign out every existing session and return a fresh token."""
+    if not current_user.hashed_password:
+        raise HTTPException(status_code=400, detail="This account signs in with Google and has no password")
+    if not verify_password(change.current_password, current_user.hashed_password):
+        raise HTTPException(status_code=400, detail="Current password is incorrect")
+
+    exp = token_cache.decode(token).get("exp")
+    current_user.hashed_password = get_password_hash(change.new_password)
+    sub = token_subject(current_user)
+    current_user.tokens_valid_after = token_cache.revoke_subject(sub)
+    # Revocation has one-second granularity, so also drop the token used for this request
+    token_cache.revoke_token(token, exp, db)
+    db.commit()
+    access_token = create_access_token(
+        data={"sub": sub}, expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
@@ -125,6 +167,6 @@ async def google_callback(request: Request, db: Session = Depends(get_db)):
             user.google_refresh_token = refresh_token
         db.commit()
 
-    access_token = create_access_token(data={"sub": user.username if user.username else user.email})
+    access_token = create_access_token(data={"sub": token_subject(user)})
     
     return RedirectResponse(url=f"{FRONTEND_URL}/login/callback?token={access_token}")
@@ -2,12 +2,16 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
 from datetime import datetime
+import asyncio
 import google.generativeai as genai
 from database import get_db
 from models.user import UserDB
 from schemas.chat import ChatRequest, CalendarEventResponse
 from services.auth_service import get_current_user
-from calendar_service import create_event, get_upcoming_events
+from calendar_service import get_upcoming_events
+from services.ai_service import run_tool_loop
+from services.chat_tools import tool_declarations, execute_tool
+from services.vector_index import build_personal_context, index_chat_turn
 from config import GOOGLE_API_KEY
 
 router = APIRouter(prefix="/api", tags=["chat"])
@@ -17,17 +21,6 @@ if GOOGLE_API_KEY:
     genai.configure(api_key=GOOGLE_API_KEY)
 
 
-def create_calendar_event_tool(summary: str, start_time: str, end_time: str):
-    """Schedules an event in the user's Google Calendar.
-    
-    Args:
-        summary: The title of the event.
-        start_time: ISO format start time (e.g. 2023-10-27T10:00:00).
-        end_time: ISO format end time.
-    """
-    pass  # This is just for Gemini's tool definition
-
-
 @router.post("/chat")
 async def chat_endpoint(request: ChatRequest, current_user: UserDB = Depends(get_current_user)):
     """Chat with AI assistant."""
@@ -35,40 +28,33 @@ async def chat_endpoint(request: ChatRequest, current_user: UserDB = Depends(get
         return {"response": f"Simulated AI: Hola {current_user.username}."}
     
     try:
-        model = genai.GenerativeModel("gemini-2.5-flash", tools=[create_calendar_event_tool])
+        model = genai.GenerativeModel("gemini-2.5-flash", tools=tool_declarations())
         chat = model.start_chat()
         
-        system_instruction = f"Contexto: {request.context}. Usuario: {current_user.username}. Eres un asistente útil. Tienes herramientas para agendar en Google Calendar. Si el usuario pide agendar, usa la herramienta. Hoy es {datetime.now().isoformat()}."
+        system_instruction = f"Contexto: {request.context}. Usuario: {current_user.username}. Eres un asistente útil. Tienes herramientas para agendar y consultar Google Calendar y para consultar el diario de emociones del usuario. Si el usuario pide agendar, usa la herramienta; puedes llamar varias herramientas a la vez. Hoy es {datetime.now().isoformat()}."
+        try:
+            personal_context = await asyncio.to_thread(build_personal_context, current_user.id, request.message)
+        except Exception as e:
+            # Personal context is optional; answer without it
+            print(f"Error building personal context: {e}")
+            personal_context = ""
+        if personal_context:
+            system_instruction = f"{system_instruction}\n{personal_context}"
         full_prompt = f"{system_instruction}\nUser: {request.message}"
         
-        response = chat.send_message(full_prompt)
-        
-        # Check for function call
-        if response.candidates[0].content.parts[0].function_call:
-            fc = response.candidates[0].content.parts[0].function_call
-            if fc.name == "create_calendar_event_tool":
-                args = fc.args
-                result = create_event(current_user, args['summary'], args['start_time'], args['end_time'])
-                
-                if result:
-                    tool_response = {"result": f"Event created: {result}"}
-                else:
-                    tool_response = {"result": "Error: Could not create event. User is not logged in with Google or has not granted calendar permissions."}
-
-                # Send result back
-                response = chat.send_message(
-                    genai.protos.Content(
-                        parts=[genai.protos.Part(
-                            function_response=genai.protos.FunctionResponse(
-                                name="create_calendar_event_tool",
-                                response=tool_response
-                            )
-                        )]
-                    )
-                )
-                return {"response": response.text}
+        async def execute(name: str, args: dict) -> dict:
+            return await execute_tool(current_user.id, name, args)
 
-        return {"response": response.text}
+        text, executed = await run_tool_loop(chat, full_prompt, execute)
+        try:
+            await asyncio.to_thread(index_chat_turn, current_user.id, request.message, text)
+        except Exception as e:
+            # Indexing is best effort; the reply already succeeded
+            print(f"Error indexing chat turn: {e}")
+        job_ids = [result["job_id"] for _, result in executed if "job_id" in result]
+        if job_ids:
+            return {"response": text, "job_ids": job_ids}
+        return {"response": text}
 
     except Exception as e:
         error_str = str(e)
@@ -0,0 +1,21 @@
+import json
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from database import get_db
+from models.job import JobDB
+from models.user import UserDB
+from schemas.job import JobResponse
+from services.auth_service import get_current_user
+
+router = APIRouter(prefix="/api/jobs", tags=["jobs"])
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+def get_job_status(job_id: int, db: Session = Depends(get_db), current_user: UserDB = Depends(get_current_user)):
+    """Get the status of a background job owned by the current user."""
+    job = db.query(JobDB).filter(JobDB.id == job_id, JobDB.user_id == current_user.id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    res = JobResponse.model_validate(job)
+    res.result = json.loads(job.result) if job.result else None
+    return res
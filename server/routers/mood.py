@@ -1,11 +1,21 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
-from typing import List
-from database import get_db
+from typing import List, Optional
+from datetime import datetime, timezone
+from database import get_db, get_dialect_insert
 from models.mood import MoodEntryDB
 from models.user import UserDB
-from schemas.mood import MoodEntryCreate, MoodEntryResponse
+from schemas.mood import (
+    MoodEntryCreate,
+    MoodEntryResponse,
+    MoodInsightsResponse,
+    MoodEntryBatchCreate,
+    MoodEntryBatchResponse,
+)
 from services.auth_service import get_current_user
+from services.mood_insights import get_mood_insights, invalidate_mood_insights
+from services.wellbeing_aggregates import record_mood_entry, record_mood_entries
+from services.vector_index import index_mood_note, index_mood_notes
 
 router = APIRouter(prefix="/api/mood", tags=["mood"])
 
@@ -18,10 +28,29 @@ def format_mood(mood_db):
     return m
 
 
+def to_utc_naive(timestamp: datetime) -> datetime:
+    """Timestamps are stored as naive UTC."""
+    if timestamp.tzinfo is not None:
+        return timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+
 @router.get("", response_model=List[MoodEntryResponse])
-def get_moods(db: Session = Depends(get_db), current_user: UserDB = Depends(get_current_user)):
-    """Get all mood entries for current user."""
-    moods = db.query(MoodEntryDB).filter(MoodEntryDB.user_id == current_user.id).all()
+def get_moods(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+    current_user: UserDB = Depends(get_current_user),
+):
+    """Get mood entries for current user, optionally within [since, until)."""
+    query = db.query(MoodEntryDB).filter(MoodEntryDB.user_id == current_user.id)
+    # Time bounds let Postgres prune mood_entries partitions. Without them (the client's full
+    # history view) every partition's user_id index is scanned.
+    if since:
+        query = query.filter(MoodEntryDB.timestamp >= to_utc_naive(since))
+    if until:
+        query = query.filter(MoodEntryDB.timestamp < to_utc_naive(until))
+    moods = query.order_by(MoodEntryDB.timestamp).all()
     return list(map(format_mood, moods))
 
 
@@ -34,6 +63,82 @@ def log_mood(entry: MoodEntryCreate, db: Session = Depends(get_db), current_user
         user_id=current_user.id
     )
     db.add(db_entry)
+    db.flush()
+    record_mood_entry(db, current_user.id, db_entry.mood, db_entry.timestamp)
+    index_mood_note(db, current_user.id, db_entry.id, db_entry.mood, db_entry.note, db_entry.timestamp)
     db.commit()
     db.refresh(db_entry)
+    invalidate_mood_insights(current_user.id)
     return format_mood(db_entry)
+
+
+@router.post("/batch", response_model=MoodEntryBatchResponse)
+def log_mood_batch(batch: MoodEntryBatchCreate, db: Session = Depends(get_db), current_user: UserDB = Depends(get_current_user)):
+    """Sync mood entries queued offline. Safe to retry: client ids already stored are reported as duplicates."""
+    items = {}
+    for item in batch.entries:
+        items.setdefault(item.client_id, item)  # First occurrence wins within a batch
+
+    rows = [
+        {
+            "mood": item.mood,
+            "note": item.note,
+            "timestamp": to_utc_naive(item.timestamp),
+            "user_id": current_user.id,
+            "client_id": client_id,
+        }
+        for client_id, item in items.items()
+    ]
+    insert = get_dialect_insert(db)
+    inserted = db.execute(
+        insert(MoodEntryDB)
+        .values(rows)
+        # No conflict target: the unique index also covers "timestamp" when the table is partitioned
+        .on_conflict_do_nothing()
+        .returning(MoodEntryDB.id, MoodEntryDB.client_id)
+    ).all()
+    created = {client_id: entry_id for entry_id, client_id in inserted}
+
+    duplicates = {}
+    missing = [client_id for client_id in items if client_id not in created]
+    if missing:
+        duplicates = dict(
+            db.query(MoodEntryDB.client_id, MoodEntryDB.id)
+            .filter(MoodEntryDB.user_id == current_user.id, MoodEntryDB.client_id.in_(missing))
+            .all()
+        )
+
+    new_rows = [row for row in rows if row["client_id"] in created]
+    record_mood_entries(db, current_user.id, [(row["mood"], row["timestamp"]) for row in new_rows])
+    index_mood_notes(
+        db,
+        current_user.id,
+        [(created[row["client_id"]], row["mood"], row["note"], row["timestamp"]) for row in new_rows],
+    )
+    db.commit()
+    if created:
+        invalidate_mood_insights(current_user.id)
+
+    results, seen = [], set()
+    for item in batch.entries:
+        if item.client_id in created and item.client_id not in seen:
+            results.append({"client_id": item.client_id, "status": "created", "id": created[item.client_id]})
+        else:
+            entry_id = created.get(item.client_id, duplicates.get(item.client_id))
+            results.append({"client_id": item.client_id, "status": "duplicate", "id": entry_id})
+        seen.add(item.client_id)
+    return {
+        "created": sum(1 for r in results if r["status"] == "created"),
+        "duplicates": sum(1 for r in results if r["status"] == "duplicate"),
+        "results": results,
+    }
+
+
+@router.get("/insights", response_model=MoodInsightsResponse)
+def get_insights(
+    tz_offset_minutes: int = Query(0, ge=-720, le=840),  # UTC-12:00 to UTC+14:00
+    db: Session = Depends(get_db),
+    current_user: UserDB = Depends(get_current_user),
+):
+    """Get weekly trends, moving averages, stress streaks and weekday/time-of-day patterns."""
+    return get_mood_insights(db, current_user.id, tz_offset_minutes)
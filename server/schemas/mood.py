@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Optional, List, Dict
 from datetime import datetime
 
 
@@ -14,6 +14,67 @@ class MoodEntryResponse(BaseModel):
     note: Optional[str] = None
     timestamp: Optional[datetime | str] = None
     user_id: Optional[int]
+    client_id: Optional[str] = None
 
     class Config:
         from_attributes = True
+
+
+class MoodEntryBatchItem(BaseModel):
+    client_id: str = Field(..., min_length=1, max_length=64)
+    mood: str
+    note: Optional[str] = None
+    timestamp: datetime  # When the entry was originally logged on the device
+
+
+class MoodEntryBatchCreate(BaseModel):
+    entries: List[MoodEntryBatchItem] = Field(..., min_length=1, max_length=500)
+
+
+class MoodEntryBatchResult(BaseModel):
+    client_id: str
+    status: str  # created, duplicate
+    id: Optional[int] = None
+
+
+class MoodEntryBatchResponse(BaseModel):
+    created: int
+    duplicates: int
+    results: List[MoodEntryBatchResult]
+
+
+class MoodTrendBucket(BaseModel):
+    bucket: str
+    entries: int
+    average_score: float
+    stress_ratio: float
+
+
+class MoodWeeklyTrend(BaseModel):
+    week_start: str
+    entries: int
+    average_score: float
+    stress_ratio: float
+
+
+class MoodDailyAverage(BaseModel):
+    date: str
+    entries: int
+    average_score: Optional[float] = None
+    moving_average: Optional[float] = None
+
+
+class MoodStressStreaks(BaseModel):
+    current: int
+    longest: int
+
+
+class MoodInsightsResponse(BaseModel):
+    total_entries: int
+    distribution: Dict[str, int]
+    average_score: Optional[float] = None
+    weekly: List[MoodWeeklyTrend]
+    daily_moving_average: List[MoodDailyAverage]
+    stress_streaks: MoodStressStreaks
+    by_weekday: List[MoodTrendBucket]
+    by_time_of_day: List[MoodTrendBucket]
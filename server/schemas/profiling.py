@@ -0,0 +1,7 @@
+from pydantic import BaseModel, Field
+
+
+class ProfilingSettings(BaseModel):
+    enabled: bool
+    sample_rate: float = Field(0.0, ge=0.0, le=1.0)
+    path_prefix: str = "/"
@@ -8,6 +8,11 @@ class UserCreate(BaseModel):
     email: str
 
 
+class PasswordChange(BaseModel):
+    current_password: str
+    new_password: str
+
+
 class UserResponse(BaseModel):
     id: int
     username: Optional[str] = None
@@ -0,0 +1,22 @@
+from pydantic import BaseModel
+from typing import Optional, List, Dict
+from datetime import datetime
+
+
+class WellbeingBucket(BaseModel):
+    bucket_start: datetime
+    suppressed: bool
+    entries: Optional[int] = None
+    contributors: Optional[int] = None
+    moods: Dict[str, int] = {}  # Moods below the k-anonymity threshold are omitted
+
+
+class WellbeingDashboardResponse(BaseModel):
+    granularity: str
+    k_anonymity: int
+    buckets: List[WellbeingBucket]
+
+
+class WellbeingRebuildResponse(BaseModel):
+    buckets: int
+    rebuilt_from: Optional[datetime] = None  # Buckets before this were kept
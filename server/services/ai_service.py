@@ -1,6 +1,8 @@
 import os
+import asyncio
+import unicodedata
 import google.generativeai as genai
-from config import GOOGLE_API_KEY
+from config import GOOGLE_API_KEY, CHAT_MAX_TOOL_ITERATIONS
 
 # Configure Gemini
 if GOOGLE_API_KEY:
@@ -24,6 +26,21 @@ Tus funciones principales y guía de estilo son:
 NO actúes como un chatbot genérico. Mantente en personaje.
 """
 
+# Phrases that signal the "Soporte en Crisis" flow above (compared without accents)
+DISTRESS_KEYWORDS = (
+    "estres", "abrumad", "agobiad", "ansiedad", "ansios", "angustia", "panico",
+    "mal dia", "agotad", "quemad", "burnout", "no puedo mas", "no doy mas",
+    "crisis", "llorar", "llorando", "desesper", "triste", "deprimid",
+)
+
+
+def is_distress_message(message: str) -> bool:
+    """Whether a chat message should get the crisis-support priority."""
+    normalized = unicodedata.normalize("NFKD", message.lower())
+    normalized = "".join(c for c in normalized if not unicodedata.combining(c))
+    return any(keyword in normalized for keyword in DISTRESS_KEYWORDS)
+
+
 def get_gemini_model():
     """Get the configured Gemini model."""
     # Use the system instruction to define the persona
@@ -54,3 +71,47 @@ async def generate_ai_response(message: str, context: str = "general", tools: li
     response = await chat.send_message_async(message)
     
     return response
+
+
+def get_function_calls(response) -> list:
+    """All function-call parts of a model turn."""
+    calls = []
+    for part in response.candidates[0].content.parts:
+        fc = getattr(part, "function_call", None)
+        if fc and fc.name:
+            calls.append(fc)
+    return calls
+
+
+async def run_tool_loop(chat, message, execute, max_iterations: int = CHAT_MAX_TOOL_ITERATIONS):
+    """Send a message and resolve function calls until the model answers with text.
+
+    Every function call in a turn is executed concurrently with `execute(name, args)` and all
+    results are sent back in a single message. Returns (text, list of (name, result)).
+    """
+    response = await chat.send_message_async(message)
+    executed = []
+
+    for _ in range(max_iterations):
+        calls = get_function_calls(response)
+        if not calls:
+            return response.text, executed
+
+        results = await asyncio.gather(*(execute(fc.name, dict(fc.args)) for fc in calls))
+        executed.extend(zip([fc.name for fc in calls], results))
+
+        response = await chat.send_message_async(
+            genai.protos.Content(
+                parts=[
+                    genai.protos.Part(
+                        function_response=genai.protos.FunctionResponse(name=fc.name, response=result)
+                    )
+                    for fc, result in zip(calls, results)
+                ]
+            )
+        )
+
+    if get_function_calls(response):
+        print(f"Tool loop stopped after {max_iterations} iterations")
+        return "Lo siento, no pude completar todas las acciones solicitadas. ¿Podrías dividir el pedido en pasos más pequeños?", executed
+    return response.text, executed
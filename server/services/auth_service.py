@@ -1,3 +1,4 @@
+import uuid
 from datetime import datetime, timedelta
 from typing import Union
 from fastapi import Depends, HTTPException, status
@@ -7,7 +8,8 @@ from passlib.context import CryptContext
 from sqlalchemy.orm import Session
 from database import get_db
 from models.user import UserDB
-from config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from services.token_cache import token_cache
+from config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, ADMIN_EMAILS
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
@@ -37,6 +39,11 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(valid_string)
 
 
+def token_subject(user: UserDB) -> str:
+    """The `sub` claim of a user's tokens."""
+    return user.username if user.username else user.email
+
+
 def create_access_token(data: dict, expires_delta: Union[timedelta, None] = None) -> str:
     """Create a JWT access token."""
     to_encode = data.copy()
@@ -44,7 +51,8 @@ def create_access_token(data: dict, expires_delta: Union[timedelta, None] = None
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
+    # jti keeps tokens issued in the same second distinct, so revoking one does not revoke the other
+    to_encode.update({"exp": expire, "iat": datetime.utcnow(), "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -57,7 +65,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = token_cache.decode(token, db)
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
@@ -71,4 +79,17 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
 
     if user is None:
         raise credentials_exception
+    # Set on password change; the row is loaded anyway, so this costs no extra query
+    if user.tokens_valid_after is not None and payload.get("iat", 0) < user.tokens_valid_after:
+        raise credentials_exception
     return user
+
+
+async def get_current_admin(current_user: UserDB = Depends(get_current_user)) -> UserDB:
+    """Require the current user to be listed in ADMIN_EMAILS."""
+    if not current_user.email or current_user.email.lower() not in ADMIN_EMAILS:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required",
+        )
+    return current_user
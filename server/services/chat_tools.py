@@ -0,0 +1,146 @@
+import asyncio
+import hashlib
+from database import SessionLocal
+from models.mood import MoodEntryDB
+from models.user import UserDB
+from calendar_service import get_upcoming_events
+from services.job_queue import enqueue_job
+
+NOT_CONNECTED = "Error: User is not logged in with Google or has not granted calendar permissions."
+
+
+# --- Gemini tool definitions (signatures and docstrings only) ---
+
+def create_calendar_event_tool(summary: str, start_time: str, end_time: str):
+    """Schedules an event in the user's Google Calendar.
+
+    Args:
+        summary: The title of the event.
+        start_time: ISO format start time (e.g. 2023-10-27T10:00:00).
+        end_time: ISO format end time.
+    """
+    pass  # This is just for Gemini's tool definition
+
+
+def list_calendar_events_tool(max_results: int):
+    """Lists the user's upcoming Google Calendar events.
+
+    Args:
+        max_results: Maximum number of events to return (1-20).
+    """
+    pass  # This is just for Gemini's tool definition
+
+
+def get_recent_moods_tool(limit: int):
+    """Gets the user's most recent mood entries from the mood journal.
+
+    Args:
+        limit: Maximum number of entries to return (1-50).
+    """
+    pass  # This is just for Gemini's tool definition
+
+
+# --- Executors: each opens its own session so calls can run concurrently ---
+
+def _create_calendar_event(user_id: int, args: dict) -> dict:
+    db = SessionLocal()
+    try:
+        user = db.query(UserDB).filter(UserDB.id == user_id).first()
+        if not user or not user.google_access_token:
+            return {"result": NOT_CONNECTED}
+        # Calendar write runs in the background job queue
+        key_source = f"{user_id}:{args['summary']}:{args['start_time']}:{args['end_time']}"
+        job = enqueue_job(
+            db,
+            "calendar.create_event",
+            {
+                "user_id": user_id,
+                "summary": args['summary'],
+                "start_time": args['start_time'],
+                "end_time": args['end_time'],
+            },
+            idempotency_key="calendar.create_event:" + hashlib.sha256(key_source.encode()).hexdigest(),
+            user_id=user_id,
+        )
+        if job.status == "failed":
+            return {"result": f"Error: the event could not be scheduled (job {job.id}): {job.last_error}", "job_id": job.id}
+        if job.status == "succeeded":
+            return {"result": f"The event is already in the calendar (job {job.id}).", "job_id": job.id}
+        return {
+            "result": f"Event scheduling accepted (job {job.id}). It will appear in the calendar shortly.",
+            "job_id": job.id,
+        }
+    finally:
+        db.close()
+
+
+def _list_calendar_events(user_id: int, args: dict) -> dict:
+    max_results = min(max(int(args.get("max_results") or 5), 1), 20)
+    db = SessionLocal()
+    try:
+        user = db.query(UserDB).filter(UserDB.id == user_id).first()
+        if not user or not user.google_access_token:
+            return {"result": NOT_CONNECTED}
+        events = get_upcoming_events(user, max_results=max_results)
+    finally:
+        db.close()
+    return {
+        "events": [
+            {
+                "summary": e.get("summary", "No Title"),
+                "start": e["start"].get("dateTime", e["start"].get("date")),
+                "end": e["end"].get("dateTime", e["end"].get("date")),
+            }
+            for e in events
+        ]
+    }
+
+
+def _get_recent_moods(user_id: int, args: dict) -> dict:
+    limit = min(max(int(args.get("limit") or 10), 1), 50)
+    db = SessionLocal()
+    try:
+        moods = (
+            db.query(MoodEntryDB)
+            .filter(MoodEntryDB.user_id == user_id)
+            .order_by(MoodEntryDB.timestamp.desc())
+            .limit(limit)
+            .all()
+        )
+        return {
+            "moods": [
+                {
+                    "mood": m.mood,
+                    "note": m.note,
+                    "timestamp": m.timestamp.isoformat() if m.timestamp else None,
+                }
+                for m in moods
+            ]
+        }
+    finally:
+        db.close()
+
+
+# name -> (Gemini declaration, executor)
+CHAT_TOOLS = {
+    "create_calendar_event_tool": (create_calendar_event_tool, _create_calendar_event),
+    "list_calendar_events_tool": (list_calendar_events_tool, _list_calendar_events),
+    "get_recent_moods_tool": (get_recent_moods_tool, _get_recent_moods),
+}
+
+
+def tool_declarations() -> list:
+    """Functions to pass as `tools` to the Gemini model."""
+    return [declaration for declaration, _ in CHAT_TOOLS.values()]
+
+
+async def execute_tool(user_id: int, name: str, args: dict) -> dict:
+    """Run a tool in a worker thread. Errors are returned to the model instead of raised."""
+    tool = CHAT_TOOLS.get(name)
+    if tool is None:
+        return {"error": f"Unknown tool: {name}"}
+    try:
+        return await asyncio.to_thread(tool[1], user_id, args)
+    except Exception as e:
+        print(f"Tool {name} failed: {e}")
+        return {"error": str(e)}
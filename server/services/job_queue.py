@@ -0,0 +1,403 @@
+import asyncio
+import inspect
+import json
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+from sqlalchemy import and_, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from database import SessionLocal, get_dialect_insert
+from models.job import JobDB
+from config import (
+    JOB_WORKERS,
+    JOB_POLL_INTERVAL_SECONDS,
+    JOB_VISIBILITY_TIMEOUT_SECONDS,
+    JOB_RETRY_BASE_SECONDS,
+    JOB_RETRY_MAX_SECONDS,
+    JOB_RETENTION_DAYS,
+)
+
+# kind -> handler(payload) returning a JSON serializable result
+JOB_HANDLERS: Dict[str, Callable[[dict], Any]] = {}
+
+
+def register_job(kind: str):
+    """Register a handler for a job kind."""
+    def decorator(func):
+        JOB_HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+def enqueue_job(
+    db: Session,
+    kind: str,
+    payload: dict,
+    idempotency_key: Optional[str] = None,
+    user_id: Optional[int] = None,
+    max_attempts: int = 5,
+    delay_seconds: float = 0,
+) -> JobDB:
+    """Persist a job. Returns the existing job if the idempotency key was already used;
+    a failed one is requeued so the work is attempted again."""
+    if idempotency_key:
+        existing = db.query(JobDB).filter(JobDB.idempotency_key == idempotency_key).first()
+        if existing:
+            return _requeue_if_failed(db, existing, max_attempts, delay_seconds)
+
+    job = JobDB(
+        kind=kind,
+        payload=json.dumps(payload),
+        idempotency_key=idempotency_key,
+        status="pending",
+        attempts=0,
+        max_attempts=max_attempts,
+        run_after=datetime.utcnow() + timedelta(seconds=delay_seconds),
+        user_id=user_id,
+    )
+    db.add(job)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Another request enqueued the same key concurrently
+        db.rollback()
+        existing = db.query(JobDB).filter(JobDB.idempotency_key == idempotency_key).one()
+        return _requeue_if_failed(db, existing, max_attempts, delay_seconds)
+    db.refresh(job)
+    return job
+
+
+def add_jobs(db: Session, kind: str, jobs: dict[str, dict], user_id: Optional[int] = None, max_attempts: int = 5):
+    """Add jobs to the caller's transaction in one insert, so they commit together with the data
+    they refer to. `jobs` maps idempotency keys to payloads; keys already used are left as they are.
+    The caller commits."""
+    if not jobs:
+        return
+    now = datetime.utcnow()
+    insert = get_dialect_insert(db)
+    db.execute(
+        insert(JobDB)
+        .values([
+            {
+                "kind": kind,
+                "payload": json.dumps(payload),
+                "idempotency_key": key,
+                "status": "pending",
+                "attempts": 0,
+                "max_attempts": max_attempts,
+                "run_after": now,
+                "user_id": user_id,
+            }
+            for key, payload in jobs.items()
+        ])
+        .on_conflict_do_nothing(index_elements=["idempotency_key"])
+    )
+
+
+def _requeue_if_failed(db: Session, job: JobDB, max_attempts: int, delay_seconds: float) -> JobDB:
+    if job.status != "failed":
+        return job
+    now = datetime.utcnow()
+    # Conditional on the status so concurrent enqueues reset the job only once
+    # attempts restart, but the lease keeps increasing so an old holder can never match again
+    db.query(JobDB).filter(JobDB.id == job.id, JobDB.status == "failed").update(
+        {
+            JobDB.status: "pending",
+            JobDB.attempts: 0,
+            JobDB.max_attempts: max_attempts,
+            JobDB.run_after: now + timedelta(seconds=delay_seconds),
+            JobDB.locked_until: None,
+            JobDB.updated_at: now,
+        },
+        synchronize_session=False,
+    )
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff in seconds for the given number of attempts made."""
+    return min(JOB_RETRY_BASE_SECONDS * (2 ** max(attempts - 1, 0)), JOB_RETRY_MAX_SECONDS)
+
+
+def _holds_lease(lease: Optional[int]):
+    # Rows created before the lease column existed have NULL
+    return JobDB.lease.is_(None) if lease is None else JobDB.lease == lease
+
+
+def fail_expired_jobs(db: Session) -> int:
+    """Fail running jobs whose lease expired on their last attempt, instead of running them again."""
+    now = datetime.utcnow()
+    failed = (
+        db.query(JobDB)
+        .filter(JobDB.status == "running", JobDB.locked_until < now, JobDB.attempts >= JobDB.max_attempts)
+        .update(
+            {
+                JobDB.status: "failed",
+                JobDB.locked_until: None,
+                JobDB.last_error: "Lease expired on the last attempt",
+                JobDB.updated_at: now,
+            },
+            synchronize_session=False,
+        )
+    )
+    db.commit()
+    return failed
+
+
+def claim_next_job(db: Session) -> Optional[JobDB]:
+    """Lease the next runnable job, including running jobs whose visibility timeout expired."""
+    fail_expired_jobs(db)
+    now = datetime.utcnow()
+    candidate = (
+        db.query(JobDB)
+        .filter(
+            JobDB.run_after <= now,
+            or_(
+                JobDB.status == "pending",
+                and_(JobDB.status == "running", JobDB.locked_until < now),
+            ),
+        )
+        .order_by(JobDB.run_after, JobDB.id)
+        .first()
+    )
+    if candidate is None:
+        return None
+
+    # Compare-and-swap on (status, lease) so only one worker wins the lease
+    claimed = (
+        db.query(JobDB)
+        .filter(
+            JobDB.id == candidate.id,
+            JobDB.status == candidate.status,
+            _holds_lease(candidate.lease),
+        )
+        .update(
+            {
+                JobDB.status: "running",
+                JobDB.attempts: candidate.attempts + 1,
+                JobDB.lease: (candidate.lease or 0) + 1,
+                JobDB.locked_until: now + timedelta(seconds=JOB_VISIBILITY_TIMEOUT_SECONDS),
+                JobDB.updated_at: now,
+            },
+            synchronize_session=False,
+        )
+    )
+    db.commit()
+    if claimed != 1:
+        return None
+    db.refresh(candidate)
+    return candidate
+
+
+def renew_lease(db: Session, job: JobDB) -> bool:
+    """Extend a running job's visibility timeout. Returns False if the lease was lost."""
+    now = datetime.utcnow()
+    renewed = db.query(JobDB).filter(
+        JobDB.id == job.id,
+        JobDB.status == "running",
+        _holds_lease(job.lease),
+    ).update(
+        {JobDB.locked_until: now + timedelta(seconds=JOB_VISIBILITY_TIMEOUT_SECONDS), JobDB.updated_at: now},
+        synchronize_session=False,
+    )
+    db.commit()
+    return renewed == 1
+
+
+def complete_job(db: Session, job: JobDB, result: Any):
+    """Mark a leased job as succeeded."""
+    _finish(db, job, {
+        JobDB.status: "succeeded",
+        JobDB.result: json.dumps(result),
+        JobDB.locked_until: None,
+        JobDB.last_error: None,
+    })
+
+
+def fail_job(db: Session, job: JobDB, error: str):
+    """Schedule a retry with backoff, or mark the job as failed when out of attempts."""
+    if job.attempts >= job.max_attempts:
+        values = {JobDB.status: "failed"}
+    else:
+        values = {
+            JobDB.status: "pending",
+            JobDB.run_after: datetime.utcnow() + timedelta(seconds=retry_delay(job.attempts)),
+        }
+    values.update({JobDB.locked_until: None, JobDB.last_error: error})
+    _finish(db, job, values)
+
+
+def _finish(db: Session, job: JobDB, values: dict):
+    values[JobDB.updated_at] = datetime.utcnow()
+    # Only the current lease holder may finish the job
+    finished = db.query(JobDB).filter(
+        JobDB.id == job.id,
+        JobDB.status == "running",
+        _holds_lease(job.lease),
+    ).update(values, synchronize_session=False)
+    db.commit()
+    if finished != 1:
+        print(f"Job {job.id} finished after losing its lease; result discarded")
+
+
+async def run_job(job: JobDB):
+    """Execute the handler registered for a job."""
+    handler = JOB_HANDLERS.get(job.kind)
+    if handler is None:
+        raise ValueError(f"No handler registered for job kind: {job.kind}")
+    payload = json.loads(job.payload) if job.payload else {}
+    if inspect.iscoroutinefunction(handler):
+        return await handler(payload)
+    return await asyncio.to_thread(handler, payload)
+
+
+def _claim():
+    db = SessionLocal()
+    try:
+        job = claim_next_job(db)
+        if job is not None:
+            db.expunge(job)
+        return job
+    finally:
+        db.close()
+
+
+def _record(job: JobDB, result: Any = None, error: Optional[str] = None):
+    db = SessionLocal()
+    try:
+        if error is None:
+            complete_job(db, job, result)
+        else:
+            fail_job(db, job, error)
+    finally:
+        db.close()
+
+
+def _renew(job: JobDB) -> bool:
+    db = SessionLocal()
+    try:
+        return renew_lease(db, job)
+    finally:
+        db.close()
+
+
+async def _keep_lease(job: JobDB):
+    """Heartbeat: renew the lease while the handler runs, so slow jobs are not run twice."""
+    while True:
+        await asyncio.sleep(JOB_VISIBILITY_TIMEOUT_SECONDS / 3)
+        try:
+            renewed = await asyncio.to_thread(_renew, job)
+        except Exception as e:
+            print(f"Job {job.id} lease renewal failed: {e}")
+            continue
+        if not renewed:
+            print(f"Job {job.id} ({job.kind}) lost its lease")
+            return
+
+
+async def process_next_job() -> bool:
+    """Claim and run a single job. Returns False when nothing was runnable."""
+    job = await asyncio.to_thread(_claim)
+    if job is None:
+        return False
+    heartbeat = asyncio.create_task(_keep_lease(job))
+    try:
+        result = await run_job(job)
+    except Exception as e:
+        print(f"Job {job.id} ({job.kind}) attempt {job.attempts} failed: {e}")
+        error = str(e)
+    else:
+        error = None
+    finally:
+        heartbeat.cancel()
+    if error is None:
+        await asyncio.to_thread(_record, job, result)
+    else:
+        await asyncio.to_thread(_record, job, None, error)
+    return True
+
+
+class JobWorkerPool:
+    """In-process asyncio workers draining the jobs table."""
+
+    def __init__(self, workers: int = JOB_WORKERS, poll_interval: float = JOB_POLL_INTERVAL_SECONDS):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._tasks: list[asyncio.Task] = []
+        self._stopping = asyncio.Event()
+
+    async def _worker(self):
+        while not self._stopping.is_set():
+            try:
+                worked = await process_next_job()
+            except Exception as e:
+                print(f"Job worker error: {e}")
+                worked = False
+            if not worked:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    def start(self):
+        """Spawn the worker tasks on the running loop."""
+        self._stopping = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        """Stop workers after their current job. Unfinished leases are retried after the visibility timeout."""
+        self._stopping.set()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+job_pool = JobWorkerPool()
+
+
+def prune_finished_jobs(db: Session, days: int = JOB_RETENTION_DAYS) -> int:
+    """Delete succeeded and failed jobs last updated more than `days` ago.
+
+    Payloads hold chat turns and mood notes, so they are not kept longer than needed.
+    Their idempotency keys are freed too.
+    """
+    deleted = (
+        db.query(JobDB)
+        .filter(
+            JobDB.status.in_(["succeeded", "failed"]),
+            JobDB.updated_at < datetime.utcnow() - timedelta(days=days),
+        )
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    return deleted
+
+
+@register_job("jobs.prune")
+def prune_jobs_job(payload: dict):
+    """Background job: prune finished jobs, then schedule the next daily run."""
+    db = SessionLocal()
+    try:
+        deleted = prune_finished_jobs(db)
+    finally:
+        db.close()
+    schedule_job_pruning(date.fromisoformat(payload["day"]) + timedelta(days=1))
+    return {"deleted": deleted}
+
+
+def schedule_job_pruning(day: Optional[date] = None):
+    """Enqueue the (idempotent) pruning job for a day."""
+    day = day or datetime.utcnow().date()
+    delay = (datetime.combine(day, datetime.min.time()) - datetime.utcnow()).total_seconds()
+    db = SessionLocal()
+    try:
+        enqueue_job(
+            db,
+            "jobs.prune",
+            {"day": day.isoformat()},
+            idempotency_key=f"jobs.prune:{day.isoformat()}",
+            delay_seconds=max(delay, 0),
+        )
+    finally:
+        db.close()
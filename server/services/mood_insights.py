@@ -0,0 +1,184 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+import numpy as np
+from sqlalchemy.orm import Session
+from models.mood import MoodEntryDB
+from config import MOOD_INSIGHTS_HISTORY_DAYS
+
+# Mood ids used by the client (see client/src/pages/Mood.tsx)
+MOOD_CATEGORIES = ["happy", "calm", "stressed", "exhausted", "sad", "other"]
+MOOD_CODES = {mood: code for code, mood in enumerate(MOOD_CATEGORIES)}
+OTHER_CODE = MOOD_CODES["other"]
+
+# Valence score per code, used for averages and trends
+MOOD_SCORES = np.array([2.0, 1.0, -1.0, -2.0, -1.5, 0.0])
+STRESS_CODES = np.array([MOOD_CODES["stressed"], MOOD_CODES["exhausted"]])
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+# (name, first hour, last hour exclusive)
+TIME_OF_DAY = [("night", 0, 6), ("morning", 6, 12), ("afternoon", 12, 18), ("evening", 18, 24)]
+
+DAY = 86400
+WEEK = 7 * DAY
+MOVING_AVERAGE_DAYS = 7
+DAILY_HISTORY_DAYS = 30
+
+_CACHE_SIZE = 1024
+_insights_cache: "OrderedDict[tuple, dict]" = OrderedDict()
+_insights_lock = threading.Lock()  # Sync endpoints run in the threadpool
+_generations: dict[int, int] = {}  # user_id -> invalidation count, so stale results are not cached
+
+
+def load_mood_arrays(db: Session, user_id: int, days: int = MOOD_INSIGHTS_HISTORY_DAYS) -> tuple[np.ndarray, np.ndarray]:
+    """Fetch a user's last `days` of history (all of it when 0) in one query as
+    (mood codes, epoch seconds) sorted by time."""
+    query = db.query(MoodEntryDB.mood, MoodEntryDB.timestamp).filter(
+        MoodEntryDB.user_id == user_id, MoodEntryDB.timestamp.isnot(None)
+    )
+    if days:
+        # The time bound also lets Postgres prune mood_entries partitions
+        query = query.filter(MoodEntryDB.timestamp >= datetime.utcnow() - timedelta(days=days))
+    rows = query.order_by(MoodEntryDB.timestamp).all()
+    if not rows:
+        return np.empty(0, dtype=np.int8), np.empty(0, dtype=np.int64)
+
+    moods, timestamps = zip(*rows)
+    # Encode only the distinct labels, then broadcast back through the inverse index
+    labels, inverse = np.unique(np.array(moods, dtype=object).astype(str), return_inverse=True)
+    label_codes = np.array([MOOD_CODES.get(label, OTHER_CODE) for label in labels], dtype=np.int8)
+    codes = label_codes[inverse]
+    epochs = np.array(timestamps, dtype="datetime64[s]").astype(np.int64)
+    return codes, epochs
+
+
+def _epoch_to_date(seconds: int) -> str:
+    return datetime.fromtimestamp(int(seconds), tz=timezone.utc).date().isoformat()
+
+
+def _stress_streaks(is_stress: np.ndarray) -> dict:
+    """Longest and current run of consecutive stressed/exhausted entries."""
+    if not is_stress.any():
+        return {"current": 0, "longest": 0}
+    padded = np.concatenate(([0], is_stress.astype(np.int8), [0]))
+    edges = np.flatnonzero(np.diff(padded))
+    starts, ends = edges[::2], edges[1::2]
+    lengths = ends - starts
+    current = int(lengths[-1]) if ends[-1] == len(is_stress) else 0
+    return {"current": current, "longest": int(lengths.max())}
+
+
+def _grouped(keys: np.ndarray, size: int, scores: np.ndarray, is_stress: np.ndarray):
+    counts = np.bincount(keys, minlength=size)
+    score_sums = np.bincount(keys, weights=scores, minlength=size)
+    stress_sums = np.bincount(keys, weights=is_stress, minlength=size)
+    safe = np.maximum(counts, 1)
+    return counts, score_sums / safe, stress_sums / safe
+
+
+def compute_insights(codes: np.ndarray, epochs: np.ndarray, tz_offset_minutes: int = 0) -> dict:
+    """Compute trends and patterns from columnar mood history."""
+    total = int(codes.size)
+    distribution = np.bincount(codes, minlength=len(MOOD_CATEGORIES)) if total else np.zeros(len(MOOD_CATEGORIES), dtype=np.int64)
+    result = {
+        "total_entries": total,
+        "distribution": {mood: int(n) for mood, n in zip(MOOD_CATEGORIES, distribution)},
+        "average_score": None,
+        "weekly": [],
+        "daily_moving_average": [],
+        "stress_streaks": {"current": 0, "longest": 0},
+        "by_weekday": [],
+        "by_time_of_day": [],
+    }
+    if not total:
+        return result
+
+    local = epochs + tz_offset_minutes * 60
+    scores = MOOD_SCORES[codes]
+    is_stress = np.isin(codes, STRESS_CODES)
+    result["average_score"] = round(float(scores.mean()), 3)
+
+    # Weekly trends (weeks start on Monday; the epoch was a Thursday)
+    week_index = (local + 3 * DAY) // WEEK
+    weeks, week_keys = np.unique(week_index, return_inverse=True)
+    counts, averages, stress_ratio = _grouped(week_keys, weeks.size, scores, is_stress)
+    result["weekly"] = [
+        {
+            "week_start": _epoch_to_date(week * WEEK - 3 * DAY),
+            "entries": int(n),
+            "average_score": round(float(avg), 3),
+            "stress_ratio": round(float(ratio), 3),
+        }
+        for week, n, avg, ratio in zip(weeks, counts, averages, stress_ratio)
+    ]
+
+    # Daily averages over a contiguous calendar, smoothed with a trailing window
+    day_index = local // DAY
+    first_day = day_index[0]
+    day_keys = day_index - first_day
+    span = int(day_keys[-1]) + 1
+    day_counts = np.bincount(day_keys, minlength=span).astype(float)
+    day_sums = np.bincount(day_keys, weights=scores, minlength=span)
+    window = np.ones(MOVING_AVERAGE_DAYS)
+    window_counts = np.convolve(day_counts, window)[:span]
+    window_sums = np.convolve(day_sums, window)[:span]
+    moving = np.divide(window_sums, window_counts, out=np.full(span, np.nan), where=window_counts > 0)
+    daily = np.divide(day_sums, day_counts, out=np.full(span, np.nan), where=day_counts > 0)
+    start = max(span - DAILY_HISTORY_DAYS, 0)
+    result["daily_moving_average"] = [
+        {
+            "date": _epoch_to_date((first_day + i) * DAY),
+            "entries": int(day_counts[i]),
+            "average_score": None if np.isnan(daily[i]) else round(float(daily[i]), 3),
+            "moving_average": None if np.isnan(moving[i]) else round(float(moving[i]), 3),
+        }
+        for i in range(start, span)
+    ]
+
+    result["stress_streaks"] = _stress_streaks(is_stress)
+
+    weekday = (day_index + 3) % 7
+    counts, averages, stress_ratio = _grouped(weekday, 7, scores, is_stress)
+    result["by_weekday"] = [
+        {"bucket": name, "entries": int(n), "average_score": round(float(avg), 3), "stress_ratio": round(float(ratio), 3)}
+        for name, n, avg, ratio in zip(WEEKDAYS, counts, averages, stress_ratio)
+    ]
+
+    hour = (local % DAY) // 3600
+    bucket_of_hour = np.zeros(24, dtype=np.int64)
+    for i, (_, first, last) in enumerate(TIME_OF_DAY):
+        bucket_of_hour[first:last] = i
+    counts, averages, stress_ratio = _grouped(bucket_of_hour[hour], len(TIME_OF_DAY), scores, is_stress)
+    result["by_time_of_day"] = [
+        {"bucket": name, "entries": int(n), "average_score": round(float(avg), 3), "stress_ratio": round(float(ratio), 3)}
+        for (name, _, _), n, avg, ratio in zip(TIME_OF_DAY, counts, averages, stress_ratio)
+    ]
+    return result
+
+
+def get_mood_insights(db: Session, user_id: int, tz_offset_minutes: int = 0) -> dict:
+    """Memoized insights for a user. Call invalidate_mood_insights when their history changes."""
+    key = (user_id, tz_offset_minutes)
+    with _insights_lock:
+        cached = _insights_cache.get(key)
+        if cached is not None:
+            _insights_cache.move_to_end(key)
+            return cached
+        generation = _generations.get(user_id, 0)
+
+    codes, epochs = load_mood_arrays(db, user_id)
+    insights = compute_insights(codes, epochs, tz_offset_minutes)
+    with _insights_lock:
+        if _generations.get(user_id, 0) == generation:
+            _insights_cache[key] = insights
+            if len(_insights_cache) > _CACHE_SIZE:
+                _insights_cache.popitem(last=False)
+    return insights
+
+
+def invalidate_mood_insights(user_id: int):
+    """Drop every cached insight for a user."""
+    with _insights_lock:
+        _generations[user_id] = _generations.get(user_id, 0) + 1
+        for key in [k for k in _insights_cache if k[0] == user_id]:
+            del _insights_cache[key]
@@ -0,0 +1,289 @@
+"""Monthly range partitioning of mood_entries (PostgreSQL only).
+
+Enabled with MOOD_PARTITIONING=true. SQLite and unpartitioned Postgres keep the
+plain table created by SQLAlchemy. Maintenance commands, run from the server directory:
+
+    python -m services.mood_partitions ensure
+    python -m services.mood_partitions convert
+    python -m services.mood_partitions archive --before 2025-01 --format parquet --dir archive
+
+Queries are pruned to the relevant partitions only when they bound "timestamp": GET /api/mood
+with since/until and the insights query (last MOOD_INSIGHTS_HISTORY_DAYS) are; GET /api/mood
+without bounds reads every partition. Archived months keep their wellbeing buckets: a rebuild
+only replaces buckets from the oldest remaining entry onwards.
+"""
+import argparse
+import csv
+import gzip
+import os
+import re
+from datetime import date, datetime, timedelta
+from typing import Optional
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import Session
+from database import engine, SessionLocal
+from models.user import UserDB
+from services.job_queue import enqueue_job, register_job
+from config import MOOD_PARTITIONING, MOOD_PARTITION_MONTHS_AHEAD
+
+PARENT = "mood_entries"
+DEFAULT_PARTITION = "mood_entries_default"
+LEGACY_TABLE = "mood_entries_legacy"
+COLUMNS = ["id", "mood", "note", "timestamp", "user_id", "client_id"]
+QUOTED_COLUMNS = ", ".join(f'"{c}"' for c in COLUMNS)
+PARTITION_NAME = re.compile(r"^mood_entries_y(\d{4})m(\d{2})$")
+
+CREATE_PARENT = f"""
+CREATE TABLE {PARENT} (
+    id SERIAL NOT NULL,
+    mood VARCHAR,
+    note TEXT,
+    "timestamp" TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+    user_id INTEGER REFERENCES users (id),
+    client_id VARCHAR,
+    PRIMARY KEY (id, "timestamp")
+) PARTITION BY RANGE ("timestamp")
+"""
+
+# Same names as the indexes declared on MoodEntryDB. Unique indexes must include the partition key.
+INDEXES = {
+    "ix_mood_entries_id": "(id)",
+    "ix_mood_entries_mood": "(mood)",
+    "ix_mood_entries_user_timestamp": '(user_id, "timestamp")',
+    "uq_mood_entries_user_client": '(user_id, client_id, "timestamp")',
+}
+
+
+def is_enabled(bind=engine) -> bool:
+    return MOOD_PARTITIONING and bind.dialect.name == "postgresql"
+
+
+def month_start(day: date) -> date:
+    return date(day.year, day.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT}_y{month.year}m{month.month:02d}"
+
+
+def is_partitioned(conn) -> bool:
+    return conn.execute(
+        text(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table pt "
+            "JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = :name)"
+        ),
+        {"name": PARENT},
+    ).scalar()
+
+
+def list_partitions(conn) -> list[tuple[str, date]]:
+    """Monthly partitions as (name, month), oldest first. The default partition is excluded."""
+    names = conn.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = :name"
+        ),
+        {"name": PARENT},
+    ).scalars()
+    partitions = []
+    for name in names:
+        match = PARTITION_NAME.match(name)
+        if match:
+            partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+    return sorted(partitions, key=lambda p: p[1])
+
+
+def _create_parent(conn):
+    conn.execute(text(CREATE_PARENT))
+    for name, columns in INDEXES.items():
+        unique = "UNIQUE " if name.startswith("uq_") else ""
+        conn.execute(text(f"CREATE {unique}INDEX {name} ON {PARENT} {columns}"))
+    conn.execute(text(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {PARENT} DEFAULT"))
+
+
+def create_partition(conn, month: date) -> bool:
+    """Create the partition for a month. Returns False if it already exists."""
+    name = partition_name(month)
+    if conn.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar():
+        return False
+    bounds = {"lo": month, "hi": add_months(month, 1)}
+    in_range = '"timestamp" >= :lo AND "timestamp" < :hi'
+    # Postgres refuses to attach a range the default partition holds rows for, so move them over
+    conn.execute(text(f"CREATE TEMP TABLE mood_entries_moving AS SELECT * FROM {DEFAULT_PARTITION} WHERE {in_range}"), bounds)
+    conn.execute(text(f"DELETE FROM {DEFAULT_PARTITION} WHERE {in_range}"), bounds)
+    conn.execute(text(
+        f"CREATE TABLE {name} PARTITION OF {PARENT} "
+        f"FOR VALUES FROM ('{bounds['lo'].isoformat()}') TO ('{bounds['hi'].isoformat()}')"
+    ))
+    conn.execute(text(f"INSERT INTO {PARENT} SELECT * FROM mood_entries_moving"))
+    conn.execute(text("DROP TABLE mood_entries_moving"))
+    return True
+
+
+def ensure_mood_partitions(bind=engine, first_month: Optional[date] = None, months_ahead: int = MOOD_PARTITION_MONTHS_AHEAD) -> list[str]:
+    """Create partitions from first_month (default: this month) through months_ahead months from now."""
+    current = month_start(datetime.utcnow().date())
+    month = month_start(first_month) if first_month else current
+    last = add_months(current, months_ahead)
+    created = []
+    while month <= last:
+        with bind.begin() as conn:
+            if create_partition(conn, month):
+                created.append(partition_name(month))
+        month = add_months(month, 1)
+    return created
+
+
+def setup_partitioned_mood_entries(bind=engine):
+    """Create mood_entries as a partitioned table before create_all would create a plain one."""
+    if not is_enabled(bind):
+        return
+    UserDB.__table__.create(bind, checkfirst=True)
+    with bind.begin() as conn:
+        if not inspect(conn).has_table(PARENT):
+            _create_parent(conn)
+        elif not is_partitioned(conn):
+            print("WARNING: mood_entries is not partitioned. Run `python -m services.mood_partitions convert` to migrate it.")
+            return
+    ensure_mood_partitions(bind)
+
+
+def convert_to_partitioned(bind=engine) -> int:
+    """Migrate an existing plain mood_entries table. The old table is kept as mood_entries_legacy."""
+    with bind.begin() as conn:
+        if is_partitioned(conn):
+            return 0
+        conn.execute(text(f"ALTER TABLE {PARENT} RENAME TO {LEGACY_TABLE}"))
+        for name in INDEXES:
+            conn.execute(text(f"ALTER INDEX IF EXISTS {name} RENAME TO {name}_legacy"))
+        _create_parent(conn)
+
+        first, = conn.execute(text(f'SELECT min("timestamp") FROM {LEGACY_TABLE}')).one()
+        current = month_start(datetime.utcnow().date())
+        month = month_start(first.date()) if first else current
+        while month <= add_months(current, MOOD_PARTITION_MONTHS_AHEAD):
+            create_partition(conn, month)
+            month = add_months(month, 1)
+
+        moved = conn.execute(text(
+            f"INSERT INTO {PARENT} ({QUOTED_COLUMNS}) "
+            f"SELECT id, mood, note, COALESCE(\"timestamp\", now() AT TIME ZONE 'utc'), user_id, client_id "
+            f"FROM {LEGACY_TABLE}"
+        )).rowcount
+        conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{PARENT}', 'id'), COALESCE((SELECT max(id) FROM {PARENT}), 1))"
+        ))
+    return moved
+
+
+def _export(conn, name: str, path: str, fmt: str, batch_size: int = 10000) -> int:
+    rows = conn.execution_options(stream_results=True).execute(
+        text(f'SELECT {QUOTED_COLUMNS} FROM {name} ORDER BY "timestamp"')
+    )
+    count = 0
+    if fmt == "parquet":
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+        schema = pa.schema([
+            ("id", pa.int64()), ("mood", pa.string()), ("note", pa.string()),
+            ("timestamp", pa.timestamp("us")), ("user_id", pa.int64()), ("client_id", pa.string()),
+        ])
+        with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+            while batch := rows.fetchmany(batch_size):
+                writer.write_table(pa.Table.from_pylist([dict(zip(COLUMNS, r)) for r in batch], schema=schema))
+                count += len(batch)
+    else:
+        with gzip.open(path, "wt", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(COLUMNS)
+            while batch := rows.fetchmany(batch_size):
+                writer.writerows(
+                    [r[0], r[1], r[2], r[3].isoformat() if r[3] else "", r[4], r[5]] for r in batch
+                )
+                count += len(batch)
+    return count
+
+
+def archive_partitions(before: date, directory: str, fmt: str = "csv", keep: bool = False, bind=engine) -> list[str]:
+    """Detach every monthly partition that ends on or before `before`, export it and drop it."""
+    os.makedirs(directory, exist_ok=True)
+    extension = "parquet" if fmt == "parquet" else "csv.gz"
+    with bind.connect() as conn:
+        old = [(name, month) for name, month in list_partitions(conn) if add_months(month, 1) <= month_start(before)]
+
+    written = []
+    for name, month in old:
+        with bind.begin() as conn:
+            conn.execute(text(f"ALTER TABLE {PARENT} DETACH PARTITION {name}"))
+        path = os.path.join(directory, f"{name}.{extension}")
+        with bind.connect() as conn:
+            count = _export(conn, name, path, fmt)
+        if not keep:
+            with bind.begin() as conn:
+                conn.execute(text(f"DROP TABLE {name}"))
+        print(f"Archived {name}: {count} rows -> {path}")
+        written.append(path)
+    return written
+
+
+@register_job("mood_partitions.maintain")
+def maintain_partitions_job(payload: dict):
+    """Background job: keep future partitions created, then schedule the next daily run."""
+    created = ensure_mood_partitions()
+    schedule_partition_maintenance(date.fromisoformat(payload["day"]) + timedelta(days=1))
+    return {"created": created}
+
+
+def schedule_partition_maintenance(day: Optional[date] = None):
+    """Enqueue the (idempotent) maintenance job for a day."""
+    if not is_enabled():
+        return
+    day = day or datetime.utcnow().date()
+    delay = (datetime.combine(day, datetime.min.time()) - datetime.utcnow()).total_seconds()
+    db: Session = SessionLocal()
+    try:
+        enqueue_job(
+            db,
+            "mood_partitions.maintain",
+            {"day": day.isoformat()},
+            idempotency_key=f"mood_partitions.maintain:{day.isoformat()}",
+            delay_seconds=max(delay, 0),
+        )
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="mood_entries partition maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("ensure", help="Create current and future monthly partitions")
+    commands.add_parser("convert", help="Migrate a plain mood_entries table to a partitioned one")
+    archive = commands.add_parser("archive", help="Detach and export old partitions")
+    archive.add_argument("--before", required=True, help="First month to keep, YYYY-MM")
+    archive.add_argument("--dir", default="archive")
+    archive.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    archive.add_argument("--keep", action="store_true", help="Keep the detached tables instead of dropping them")
+    args = parser.parse_args()
+
+    if engine.dialect.name != "postgresql":
+        parser.error("Partitioning requires PostgreSQL")
+    if args.command == "ensure":
+        print(f"Created: {ensure_mood_partitions() or 'nothing'}")
+    elif args.command == "convert":
+        print(f"Moved {convert_to_partitioned(engine)} rows; the old table is kept as {LEGACY_TABLE}")
+    elif args.command == "archive":
+        before = datetime.strptime(args.before, "%Y-%m").date()
+        archive_partitions(before, args.dir, args.format, args.keep)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+from jose import JWTError, jwt
+from sqlalchemy.orm import Session
+from database import get_dialect_insert
+from models.user import RevokedTokenDB
+from config import SECRET_KEY, ALGORITHM, TOKEN_CACHE_SIZE, REVOCATION_CHECK_TTL_SECONDS
+
+
+def token_digest(token: str) -> str:
+    """Cache key for a token, so raw tokens are never kept in memory."""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class TokenCache:
+    """Bounded LRU of verified JWT claims, valid until each token's exp.
+
+    Revocations are applied to this process immediately and persisted in revoked_tokens, which
+    is re-checked at most every REVOCATION_CHECK_TTL_SECONDS per token so other workers see them.
+    """
+
+    def __init__(self, max_size: int = TOKEN_CACHE_SIZE, check_ttl: float = REVOCATION_CHECK_TTL_SECONDS):
+        self.max_size = max_size
+        self.check_ttl = check_ttl
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._checked: "OrderedDict[str, float]" = OrderedDict()  # digest -> monotonic time of the last DB check
+        self._revoked_tokens: dict[str, float] = {}  # digest -> exp
+        self._revoked_subjects: dict[str, int] = {}  # sub -> tokens issued before this second are invalid
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.decode_seconds = 0.0
+
+    def _is_revoked(self, digest: str, claims: dict) -> bool:
+        if digest in self._revoked_tokens:
+            return True
+        revoked_before = self._revoked_subjects.get(claims.get("sub"))
+        # iat is whole seconds, so tokens issued in the revocation's second stay valid (a re-login
+        # right after a password change must work). Tokens without iat predate the claim.
+        return revoked_before is not None and claims.get("iat", 0) < revoked_before
+
+    def _revoked_in_db(self, digest: str, claims: dict, db: Session) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            checked = self._checked.get(digest)
+            if checked is not None and now - checked < self.check_ttl:
+                return False
+        revoked = db.get(RevokedTokenDB, digest) is not None
+        with self._lock:
+            if revoked:
+                self._checked.pop(digest, None)
+                self._revoked_tokens[digest] = claims["exp"]
+            else:
+                self._checked[digest] = now
+                self._checked.move_to_end(digest)
+                if len(self._checked) > self.max_size:
+                    self._checked.popitem(last=False)
+        return revoked
+
+    def decode(self, token: str, db: Optional[Session] = None) -> dict:
+        """Return verified claims. Raises JWTError for invalid, expired or revoked tokens.
+
+        Without a session only revocations made by this process are seen.
+        """
+        digest = token_digest(token)
+        now = time.time()
+        with self._lock:
+            claims = self._entries.get(digest)
+            if claims is not None:
+                if claims["exp"] <= now:
+                    del self._entries[digest]
+                    claims = None
+                else:
+                    self._entries.move_to_end(digest)
+                    self.hits += 1
+
+        if claims is None:
+            started = time.perf_counter()
+            claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.misses += 1
+                self.decode_seconds += elapsed
+                # Tokens without exp are never cached
+                if isinstance(claims.get("exp"), (int, float)):
+                    self._entries[digest] = claims
+                    if len(self._entries) > self.max_size:
+                        self._entries.popitem(last=False)
+
+        with self._lock:
+            revoked = self._is_revoked(digest, claims)
+        if not revoked and db is not None and isinstance(claims.get("exp"), (int, float)):
+            revoked = self._revoked_in_db(digest, claims, db)
+        if revoked:
+            with self._lock:
+                self._entries.pop(digest, None)
+            raise JWTError("Token has been revoked")
+        return claims
+
+    def revoke_token(self, token: str, exp: Optional[float] = None, db: Optional[Session] = None):
+        """Revoke a single token (logout). With a session it is also persisted; the caller commits."""
+        digest = token_digest(token)
+        exp = exp if exp is not None else time.time() + 86400 * 365
+        with self._lock:
+            self._entries.pop(digest, None)
+            self._checked.pop(digest, None)
+            self._revoked_tokens[digest] = exp
+            self._prune_revoked()
+        if db is not None:
+            insert = get_dialect_insert(db)
+            db.execute(
+                insert(RevokedTokenDB)
+                .values(digest=digest, expires_at=datetime.utcfromtimestamp(exp))
+                .on_conflict_do_nothing(index_elements=["digest"])
+            )
+            # Expired tokens fail verification anyway, so their rows can go
+            db.query(RevokedTokenDB).filter(RevokedTokenDB.expires_at < datetime.utcnow()).delete(
+                synchronize_session=False
+            )
+
+    def revoke_subject(self, sub: str) -> int:
+        """Revoke every token issued before the current second for a subject (password change).
+
+        Returns that second; persist it as the user's tokens_valid_after so every worker applies it.
+        """
+        revoked_before = int(time.time())
+        with self._lock:
+            self._revoked_subjects[sub] = revoked_before
+            for digest in [d for d, claims in self._entries.items() if claims.get("sub") == sub]:
+                del self._entries[digest]
+        return revoked_before
+
+    def _prune_revoked(self):
+        now = time.time()
+        for digest in [d for d, exp in self._revoked_tokens.items() if exp <= now]:
+            del self._revoked_tokens[digest]
+
+    def stats(self) -> dict:
+        """Hit rate and the signature-verification CPU time avoided by hits."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            avg_decode = self.decode_seconds / self.misses if self.misses else 0.0
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "avg_decode_ms": avg_decode * 1000,
+                "cpu_saved_per_request_ms": avg_decode * 1000 * (self.hits / lookups if lookups else 0.0),
+                "cpu_saved_total_ms": avg_decode * 1000 * self.hits,
+                "revoked_tokens": len(self._revoked_tokens),
+                "revoked_subjects": len(self._revoked_subjects),
+                "revocation_checks_cached": len(self._checked),
+            }
+
+
+token_cache = TokenCache()
@@ -0,0 +1,342 @@
+"""Per-user vector index over mood notes and chat turns, used as personal chat context.
+
+The index lives on local disk (VECTOR_INDEX_DIR). Mood notes can be re-indexed from the
+database after a redeploy; chat turns are only stored in the index. From the server directory:
+
+    python -m services.vector_index rebuild [--user ID]
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import threading
+import unicodedata
+import uuid
+from datetime import datetime
+from typing import Optional
+import numpy as np
+import google.generativeai as genai
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from models.mood import MoodEntryDB
+from services.job_queue import add_jobs, enqueue_job, register_job
+from config import (
+    GOOGLE_API_KEY,
+    EMBEDDING_BACKEND,
+    VECTOR_INDEX_DIR,
+    CHAT_CONTEXT_SNIPPETS,
+    CHAT_CONTEXT_MAX_CHARS,
+)
+
+TOKEN = re.compile(r"\w+")
+STOPWORDS = {
+    "de", "la", "el", "los", "las", "un", "una", "en", "y", "o", "que", "con", "por", "para",
+    "del", "al", "me", "mi", "se", "lo", "le", "no", "es", "muy", "estoy", "tengo", "hoy",
+}
+
+
+class HashingEmbedder:
+    """Deterministic local embedding: signed feature hashing of words and word bigrams."""
+    name = "hashing"
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+
+    def _features(self, text: str) -> list[str]:
+        normalized = unicodedata.normalize("NFKD", text.lower())
+        normalized = "".join(c for c in normalized if not unicodedata.combining(c))
+        words = [w for w in TOKEN.findall(normalized) if w not in STOPWORDS]
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    def embed(self, texts: list[str], query: bool = False) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+                value = int.from_bytes(digest, "little")
+                vectors[row, value % self.dim] += 1.0 if (value >> 63) else -1.0
+        return vectors
+
+
+class GeminiEmbedder:
+    """Gemini text embeddings."""
+    name = "gemini"
+    dim = 768
+
+    def embed(self, texts: list[str], query: bool = False) -> np.ndarray:
+        result = genai.embed_content(
+            model="models/text-embedding-004",
+            content=texts,
+            task_type="retrieval_query" if query else "retrieval_document",
+        )
+        return np.asarray(result["embedding"], dtype=np.float32).reshape(len(texts), self.dim)
+
+
+def get_embedder():
+    if EMBEDDING_BACKEND == "gemini" or (EMBEDDING_BACKEND == "auto" and GOOGLE_API_KEY):
+        return GeminiEmbedder()
+    return HashingEmbedder()
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return (vectors / np.maximum(norms, 1e-12)).astype(np.float32)
+
+
+class UserVectorIndex:
+    """Append-only per-user index: unit float32 vectors in <user>.f32 (memory-mapped for search),
+    snippet metadata in <user>.jsonl and their byte offsets in <user>.off."""
+
+    def __init__(self, user_id: int, embedder, directory: str = VECTOR_INDEX_DIR):
+        self.user_id = user_id
+        self.embedder = embedder
+        base = os.path.join(directory, embedder.name, str(user_id))
+        self.vectors_path = base + ".f32"
+        self.meta_path = base + ".jsonl"
+        self.offsets_path = base + ".off"
+
+    def __len__(self) -> int:
+        if not (os.path.exists(self.offsets_path) and os.path.exists(self.vectors_path)):
+            return 0
+        vectors = os.path.getsize(self.vectors_path) // (4 * self.embedder.dim)
+        offsets = os.path.getsize(self.offsets_path) // 8
+        # A crash between writes leaves the files uneven; only complete rows count
+        return min(vectors, offsets)
+
+    def _truncate_to_complete_rows(self):
+        """Drop what a crashed append left past the last complete row, so the next append
+        starts every file at the same row. Called with the user's lock held."""
+        n = len(self)
+        meta_end = 0
+        if n:
+            last = int(np.fromfile(self.offsets_path, dtype=np.int64, count=n)[-1])
+            with open(self.meta_path, "rb") as meta:
+                meta.seek(last)
+                meta_end = last + len(meta.readline())
+        sizes = {self.meta_path: meta_end, self.vectors_path: n * 4 * self.embedder.dim, self.offsets_path: n * 8}
+        for path, size in sizes.items():
+            if os.path.exists(path) and os.path.getsize(path) > size:
+                os.truncate(path, size)
+
+    def add(self, texts: list[str], metadata: list[dict]):
+        """Embed and append snippets. metadata[i] is stored alongside texts[i]."""
+        vectors = _normalize(self.embedder.embed(texts))
+        with _user_lock(self.user_id):
+            self._append(texts, metadata, vectors)
+
+    def _append(self, texts: list[str], metadata: list[dict], vectors: np.ndarray):
+        """Write embedded rows. Called with the user's lock held."""
+        os.makedirs(os.path.dirname(self.vectors_path), exist_ok=True)
+        self._truncate_to_complete_rows()
+        with open(self.meta_path, "ab") as meta, open(self.vectors_path, "ab") as vec, open(self.offsets_path, "ab") as off:
+            for text, extra, vector in zip(texts, metadata, vectors):
+                offset = meta.tell()
+                meta.write((json.dumps({**extra, "text": text}, ensure_ascii=False) + "\n").encode("utf-8"))
+                meta.flush()
+                vec.write(vector.tobytes())
+                vec.flush()
+                off.write(np.int64(offset).tobytes())
+
+    def clear(self):
+        """Delete the index files. Called with the user's lock held."""
+        for path in (self.meta_path, self.vectors_path, self.offsets_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def search(self, query: str, k: int = CHAT_CONTEXT_SNIPPETS) -> list[dict]:
+        """Top-k snippets by cosine similarity."""
+        n = len(self)
+        if n == 0 or k <= 0:
+            return []
+        q = _normalize(self.embedder.embed([query], query=True))[0]
+        matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(n, self.embedder.dim))
+        scores = matrix @ q
+        k = min(k, n)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        offsets = np.memmap(self.offsets_path, dtype=np.int64, mode="r", shape=(n,))
+        results = []
+        with open(self.meta_path, "rb") as meta:
+            for row in top:
+                meta.seek(int(offsets[row]))
+                item = json.loads(meta.readline())
+                item["score"] = float(scores[row])
+                results.append(item)
+        return results
+
+
+_locks: dict[int, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+
+def _user_lock(user_id: int) -> threading.Lock:
+    with _locks_guard:
+        return _locks.setdefault(user_id, threading.Lock())
+
+
+def get_user_index(user_id: int) -> UserVectorIndex:
+    return UserVectorIndex(user_id, get_embedder())
+
+
+@register_job("vector_index.add")
+def add_snippet_job(payload: dict):
+    """Background job: embed one snippet into a user's index."""
+    get_user_index(payload["user_id"]).add(
+        [payload["text"]],
+        [{"kind": payload["kind"], "timestamp": payload.get("timestamp")}],
+    )
+    return {"indexed": 1}
+
+
+def _snippet_payload(user_id: int, kind: str, text: str, timestamp: Optional[datetime]) -> dict:
+    return {
+        "user_id": user_id,
+        "kind": kind,
+        "text": text[:2000],
+        "timestamp": timestamp.isoformat() if timestamp else None,
+    }
+
+
+def enqueue_snippet(db: Session, user_id: int, kind: str, text: str, key: str, timestamp: Optional[datetime] = None):
+    """Queue a snippet for indexing. `key` makes retries idempotent."""
+    enqueue_job(
+        db,
+        "vector_index.add",
+        _snippet_payload(user_id, kind, text, timestamp),
+        idempotency_key=f"vector_index.{kind}:{key}",
+        user_id=user_id,
+    )
+
+
+def mood_note_text(mood: str, note: str) -> str:
+    return f"Ánimo {mood}: {note.strip()}"
+
+
+def index_mood_note(db: Session, user_id: int, entry_id: int, mood: str, note: Optional[str], timestamp: Optional[datetime]):
+    """Queue a mood entry's note for indexing in the caller's transaction. The caller commits."""
+    index_mood_notes(db, user_id, [(entry_id, mood, note, timestamp)])
+
+
+def index_mood_notes(db: Session, user_id: int, entries: list[tuple[int, str, Optional[str], Optional[datetime]]]):
+    """Queue the notes of a user's new (id, mood, note, timestamp) entries for indexing.
+
+    The jobs are added to the caller's transaction, so an entry is never committed without its
+    indexing job. Entries without a note are skipped. The caller commits.
+    """
+    add_jobs(
+        db,
+        "vector_index.add",
+        {
+            f"vector_index.mood:{entry_id}": _snippet_payload(user_id, "mood", mood_note_text(mood, note), timestamp)
+            for entry_id, mood, note, timestamp in entries
+            if note and note.strip()
+        },
+        user_id=user_id,
+    )
+
+
+def index_chat_turn(user_id: int, message: str, reply: str):
+    """Queue a chat exchange for indexing. Opens its own session so it can run in a worker thread."""
+    db = SessionLocal()
+    try:
+        enqueue_snippet(db, user_id, "chat", f"Docente: {message}\nAsistente: {reply}", uuid.uuid4().hex, datetime.utcnow())
+    finally:
+        db.close()
+
+
+def rebuild_user_index(db: Session, user_id: int, batch_size: int = 64) -> int:
+    """Re-index a user's mood notes from the database, replacing their index.
+
+    Chat turns are not stored in the database, so they are dropped. Returns the snippets indexed.
+    """
+    index = get_user_index(user_id)
+    rows = (
+        db.query(MoodEntryDB.mood, MoodEntryDB.note, MoodEntryDB.timestamp)
+        .filter(MoodEntryDB.user_id == user_id, MoodEntryDB.note.isnot(None), MoodEntryDB.note != "")
+        .order_by(MoodEntryDB.timestamp)
+        .yield_per(batch_size)
+    )
+    count = 0
+    # Held throughout so add jobs for new notes land after the rebuilt rows, not in the removed files
+    with _user_lock(user_id):
+        index.clear()
+        batch = []
+        for mood, note, timestamp in rows:
+            if note.strip():
+                batch.append((mood_note_text(mood, note), {"kind": "mood", "timestamp": timestamp.isoformat() if timestamp else None}))
+            if len(batch) == batch_size:
+                count += _append_batch(index, batch)
+                batch = []
+        count += _append_batch(index, batch)
+    return count
+
+
+def _append_batch(index: UserVectorIndex, batch: list[tuple[str, dict]]) -> int:
+    if not batch:
+        return 0
+    texts = [text for text, _ in batch]
+    index._append(texts, [extra for _, extra in batch], _normalize(index.embedder.embed(texts)))
+    return len(batch)
+
+
+def users_with_notes(db: Session) -> list[int]:
+    return [
+        user_id
+        for user_id, in db.query(MoodEntryDB.user_id)
+        .filter(MoodEntryDB.user_id.isnot(None), MoodEntryDB.note.isnot(None), MoodEntryDB.note != "")
+        .distinct()
+    ]
+
+
+@register_job("vector_index.rebuild")
+def rebuild_user_index_job(payload: dict):
+    """Background job: rebuild one user's index from their mood notes."""
+    db = SessionLocal()
+    try:
+        return {"indexed": rebuild_user_index(db, payload["user_id"])}
+    finally:
+        db.close()
+
+
+def enqueue_index_rebuild(db: Session, user_ids: Optional[list[int]] = None) -> list[int]:
+    """Queue a rebuild for the given users (default: every user with mood notes). Returns job ids."""
+    user_ids = users_with_notes(db) if user_ids is None else user_ids
+    return [
+        enqueue_job(db, "vector_index.rebuild", {"user_id": user_id}, user_id=user_id).id
+        for user_id in user_ids
+    ]
+
+
+def build_personal_context(user_id: int, query: str, k: int = CHAT_CONTEXT_SNIPPETS) -> str:
+    """Prompt section with the k most relevant snippets, each truncated so the prompt stays bounded."""
+    snippets = get_user_index(user_id).search(query, k)
+    if not snippets:
+        return ""
+    lines = []
+    for s in snippets:
+        day = (s.get("timestamp") or "")[:10]
+        text = s["text"][:CHAT_CONTEXT_MAX_CHARS]
+        lines.append(f"- ({day}) {text}" if day else f"- {text}")
+    return "Recuerdos relevantes del docente (notas y conversaciones anteriores):\n" + "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Personal vector index maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+    rebuild = commands.add_parser("rebuild", help="Re-index mood notes from the database")
+    rebuild.add_argument("--user", type=int, help="Only this user id (default: every user with notes)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        user_ids = [args.user] if args.user else users_with_notes(db)
+        for user_id in user_ids:
+            print(f"User {user_id}: indexed {rebuild_user_index(db, user_id)} notes")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Optional
+from sqlalchemy import delete, func, insert, update
+from sqlalchemy.orm import Session
+from database import SessionLocal, get_dialect_insert
+from models.mood import MoodEntryDB
+from models.wellbeing import MoodBucketDB, MoodBucketContributorDB
+from services.job_queue import enqueue_job, register_job
+from config import WELLBEING_K_ANONYMITY, WELLBEING_CONTRIBUTOR_RETENTION_DAYS
+
+GRANULARITIES = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+TOTAL = "*"  # Pseudo mood holding the bucket total
+
+
+def bucket_start(timestamp: datetime, granularity: str) -> datetime:
+    """Truncate a timestamp to the start of its bucket."""
+    if granularity == "hour":
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def contributor_cutoff(days: int = WELLBEING_CONTRIBUTOR_RETENTION_DAYS) -> datetime:
+    """Buckets starting before this have had (or will have) their contributor rows pruned."""
+    return bucket_start(datetime.utcnow() - timedelta(days=days), "day")
+
+
+def record_mood_entry(db: Session, user_id: Optional[int], mood: str, timestamp: datetime):
+    """Fold one new mood entry into the hourly and daily buckets. The caller commits."""
+    record_mood_entries(db, user_id, [(mood, timestamp)])
+
+
+def record_mood_entries(db: Session, user_id: Optional[int], entries: list[tuple[str, datetime]]):
+    """Fold a user's new (mood, timestamp) entries into the buckets, one upsert per touched cell."""
+    counts = defaultdict(int)
+    for mood, timestamp in entries:
+        for granularity in GRANULARITIES:
+            start = bucket_start(timestamp, granularity)
+            for cell in (mood, TOTAL):
+                counts[(granularity, start, cell)] += 1
+
+    # Only entries synced long after the fact can land in a pruned bucket, so usually no query is needed
+    old_starts = {start for _, start, _ in counts if start < contributor_cutoff()}
+    pruned = set()
+    if user_id is not None and old_starts:
+        pruned = {
+            tuple(row)
+            for row in db.query(MoodBucketDB.granularity, MoodBucketDB.bucket_start, MoodBucketDB.mood)
+            .filter(MoodBucketDB.bucket_start.in_(old_starts), MoodBucketDB.contributors_pruned.is_(True))
+        }
+
+    dialect_insert = get_dialect_insert(db)
+    for (granularity, start, cell), count in counts.items():
+        is_new_contributor = False
+        # Without its contributor rows a bucket cannot tell a new user from a returning one, and
+        # overcounting would weaken k-anonymity, so its count stays as it was
+        if user_id is not None and (granularity, start, cell) not in pruned:
+            result = db.execute(
+                dialect_insert(MoodBucketContributorDB)
+                .values(granularity=granularity, bucket_start=start, mood=cell, user_id=user_id)
+                .on_conflict_do_nothing(index_elements=["granularity", "bucket_start", "mood", "user_id"])
+            )
+            is_new_contributor = result.rowcount == 1
+
+        db.execute(
+            dialect_insert(MoodBucketDB)
+            .values(
+                granularity=granularity,
+                bucket_start=start,
+                mood=cell,
+                entry_count=count,
+                contributor_count=int(is_new_contributor),
+            )
+            .on_conflict_do_update(
+                index_elements=["granularity", "bucket_start", "mood"],
+                set_={
+                    "entry_count": MoodBucketDB.entry_count + count,
+                    "contributor_count": MoodBucketDB.contributor_count + int(is_new_contributor),
+                },
+            )
+        )
+
+
+def rebuild_mood_buckets(db: Session, batch_size: int = 5000) -> tuple[int, Optional[datetime]]:
+    """Recompute the buckets from the raw mood entries still in mood_entries.
+
+    Only buckets from the day of the oldest entry onwards are replaced, so history whose raw
+    entries were archived (see services.mood_partitions) is kept. Contributor rows are only
+    written for buckets newer than contributor_cutoff(). Returns the number of bucket cells
+    written and the start of the rebuilt range (None when there are no entries).
+    """
+    oldest = db.query(func.min(MoodEntryDB.timestamp)).scalar()
+    if oldest is None:
+        return 0, None
+    since = bucket_start(oldest, "day")
+
+    entries = defaultdict(int)
+    contributors = defaultdict(set)
+    rows = (
+        db.query(MoodEntryDB.user_id, MoodEntryDB.mood, MoodEntryDB.timestamp)
+        .filter(MoodEntryDB.timestamp.isnot(None))
+        .yield_per(batch_size)
+    )
+    for user_id, mood, timestamp in rows:
+        for granularity in GRANULARITIES:
+            start = bucket_start(timestamp, granularity)
+            for cell in (mood, TOTAL):
+                key = (granularity, start, cell)
+                entries[key] += 1
+                if user_id is not None:
+                    contributors[key].add(user_id)
+
+    cutoff = contributor_cutoff()
+    db.execute(delete(MoodBucketContributorDB).where(MoodBucketContributorDB.bucket_start >= since))
+    db.execute(delete(MoodBucketDB).where(MoodBucketDB.bucket_start >= since))
+    bucket_rows = [
+        {
+            "granularity": granularity,
+            "bucket_start": start,
+            "mood": cell,
+            "entry_count": count,
+            "contributor_count": len(contributors.get((granularity, start, cell), ())),
+            "contributors_pruned": start < cutoff,
+        }
+        for (granularity, start, cell), count in entries.items()
+    ]
+    contributor_rows = [
+        {"granularity": granularity, "bucket_start": start, "mood": cell, "user_id": user_id}
+        for (granularity, start, cell), users in contributors.items()
+        if start >= cutoff
+        for user_id in users
+    ]
+    for i in range(0, len(bucket_rows), batch_size):
+        db.execute(insert(MoodBucketDB), bucket_rows[i:i + batch_size])
+    for i in range(0, len(contributor_rows), batch_size):
+        db.execute(insert(MoodBucketContributorDB), contributor_rows[i:i + batch_size])
+    db.commit()
+    return len(bucket_rows), since
+
+
+def prune_bucket_contributors(db: Session, days: int = WELLBEING_CONTRIBUTOR_RETENTION_DAYS) -> int:
+    """Delete the per-user contributor rows of buckets older than `days` and freeze their counts.
+
+    The rows are only needed to keep contributor counts distinct while entries still arrive,
+    and they record which teacher logged which mood when. Returns the number of rows deleted.
+    """
+    cutoff = contributor_cutoff(days)
+    db.execute(
+        update(MoodBucketDB)
+        .where(MoodBucketDB.bucket_start < cutoff, MoodBucketDB.contributors_pruned.isnot(True))
+        .values(contributors_pruned=True)
+    )
+    deleted = db.execute(
+        delete(MoodBucketContributorDB).where(MoodBucketContributorDB.bucket_start < cutoff)
+    ).rowcount
+    db.commit()
+    return deleted
+
+
+@register_job("wellbeing.prune_contributors")
+def prune_contributors_job(payload: dict):
+    """Background job: prune old contributor rows, then schedule the next daily run."""
+    db = SessionLocal()
+    try:
+        deleted = prune_bucket_contributors(db)
+    finally:
+        db.close()
+    schedule_contributor_pruning(date.fromisoformat(payload["day"]) + timedelta(days=1))
+    return {"deleted": deleted}
+
+
+def schedule_contributor_pruning(day: Optional[date] = None):
+    """Enqueue the (idempotent) pruning job for a day."""
+    day = day or datetime.utcnow().date()
+    delay = (datetime.combine(day, datetime.min.time()) - datetime.utcnow()).total_seconds()
+    db = SessionLocal()
+    try:
+        enqueue_job(
+            db,
+            "wellbeing.prune_contributors",
+            {"day": day.isoformat()},
+            idempotency_key=f"wellbeing.prune_contributors:{day.isoformat()}",
+            delay_seconds=max(delay, 0),
+        )
+    finally:
+        db.close()
+
+
+def _suppressed_cells(cells: dict, lines: list, k: int) -> set:
+    """Keys of the cells to hide: those with fewer than k contributors plus complementary cells.
+
+    `cells` maps (bucket_start, mood) to a bucket row. Each line is (member keys, margin key):
+    the members add up to the margin, and margin None stands for a total published elsewhere.
+    A line with a hidden member must hide at least two, one of them with k or more contributors,
+    otherwise the hidden value is the margin minus the visible members.
+    """
+    hidden = set()
+    rows = defaultdict(list)
+    for key in cells:
+        rows[key[0]].append(key)
+
+    def hide(key):
+        hidden.add(key)
+        if key[1] == TOTAL:
+            hidden.update(rows[key[0]])  # Without its total, the bucket's moods would reveal it
+
+    for key, cell in cells.items():
+        if cell.contributor_count < k:
+            hide(key)
+    # Cells alone in a line with an external margin equal that margin, so hiding them protects nothing
+    pinned = {members[0] for members, margin in lines if margin is None and len(members) == 1}
+
+    changed = True
+    while changed:
+        changed = False
+        for members, margin in lines:
+            if margin in hidden:
+                continue
+            hidden_members = [m for m in members if m in hidden]
+            visible = [m for m in members if m not in hidden]
+            if not hidden_members or not visible:
+                continue
+            if len(hidden_members) >= 2 and any(cells[m].contributor_count >= k for m in hidden_members):
+                continue
+            candidates = [m for m in visible if m not in pinned]
+            if candidates:
+                hide(min(candidates, key=lambda m: (cells[m].entry_count, m[1])))
+            elif margin is not None:
+                hide(margin)
+            else:
+                continue
+            changed = True
+    return hidden
+
+
+def get_wellbeing_dashboard(
+    db: Session,
+    granularity: str,
+    start: datetime,
+    end: datetime,
+    k: int = WELLBEING_K_ANONYMITY,
+) -> dict:
+    """Read pre-aggregated buckets in [start, end), suppressing groups smaller than k contributors.
+
+    Hourly buckets are read for whole days and protected against the daily totals as well.
+    """
+    first = bucket_start(start, granularity)
+    query_start, query_end = first, end
+    if granularity == "hour":
+        query_start = bucket_start(start, "day")
+        query_end = bucket_start(end, "day") + GRANULARITIES["day"]
+    rows = (
+        db.query(MoodBucketDB)
+        .filter(
+            MoodBucketDB.granularity == granularity,
+            MoodBucketDB.bucket_start >= query_start,
+            MoodBucketDB.bucket_start < query_end,
+        )
+        .order_by(MoodBucketDB.bucket_start)
+        .all()
+    )
+    cells = {(row.bucket_start, row.mood): row for row in rows}
+
+    by_bucket = defaultdict(dict)
+    for (start_time, mood), cell in cells.items():
+        by_bucket[start_time][mood] = cell
+    lines = [
+        ([(start_time, mood) for mood in moods if mood != TOTAL], (start_time, TOTAL))
+        for start_time, moods in by_bucket.items()
+        if TOTAL in moods
+    ]
+    if granularity == "hour":
+        # Each mood (and the total) summed over a day's hours is the daily value
+        by_day = defaultdict(list)
+        for start_time, mood in cells:
+            by_day[(bucket_start(start_time, "day"), mood)].append((start_time, mood))
+        lines.extend((members, None) for members in by_day.values())
+    hidden = _suppressed_cells(cells, lines, k)
+
+    buckets = []
+    for start_time, moods in by_bucket.items():
+        if start_time < first or start_time >= end:
+            continue
+        total = moods.get(TOTAL)
+        if total is None or (start_time, TOTAL) in hidden:
+            buckets.append({
+                "bucket_start": start_time,
+                "suppressed": True,
+                "entries": None,
+                "contributors": None,
+                "moods": {},
+            })
+            continue
+        buckets.append({
+            "bucket_start": start_time,
+            "suppressed": False,
+            "entries": total.entry_count,
+            "contributors": total.contributor_count,
+            # Hidden moods are left out entirely, so their presence is not revealed either
+            "moods": {
+                mood: cell.entry_count
+                for mood, cell in moods.items()
+                if mood != TOTAL and (start_time, mood) not in hidden
+            },
+        })
+
+    return {"granularity": granularity, "k_anonymity": k, "buckets": buckets}
@@ -0,0 +1,38 @@
+import os
+import tempfile
+
+# Point the app at a throwaway SQLite database before any module reads config
+_tmp = tempfile.mkdtemp(prefix="bienestar-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp, 'test.db')}"
+os.environ["VECTOR_INDEX_DIR"] = os.path.join(_tmp, "vector_index")
+os.environ["EMBEDDING_BACKEND"] = "hashing"
+os.environ["GOOGLE_API_KEY"] = ""
+
+import pytest
+from database import Base, SessionLocal, engine
+import models.community, models.job, models.mood, models.user, models.wellbeing  # noqa: F401 (register tables)
+
+
+@pytest.fixture
+def db():
+    """A session on freshly created tables."""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client(db):
+    """API client without startup events (no background job workers), with a registered teacher."""
+    from fastapi.testclient import TestClient
+    import main
+
+    client = TestClient(main.app)
+    client.post("/api/register", json={"username": "ana", "password": "secret", "email": "ana@school.test"})
+    token = client.post("/api/token", data={"username": "ana", "password": "secret"}).json()["access_token"]
+    client.headers["Authorization"] = f"Bearer {token}"
+    return client
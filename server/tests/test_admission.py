@@ -0,0 +1,48 @@
+import asyncio
+import json
+from middleware.admission import AdmissionLimiter, MAX_CLASSIFIED_BODY, _is_distress_request, _read_body
+
+
+def receiver(chunks):
+    messages = [{"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1} for i, chunk in enumerate(chunks)]
+    read = []
+
+    async def receive():
+        read.append(messages[len(read)])
+        return read[-1]
+    return receive, read
+
+
+def test_read_body_stops_past_the_classification_limit():
+    receive, read = receiver([b"x" * (MAX_CLASSIFIED_BODY // 2)] * 10)
+
+    messages, body = asyncio.run(_read_body(receive))
+
+    assert body is None
+    assert len(read) == 3  # The rest is left for the app to read
+    assert messages == read
+    assert not _is_distress_request(body)
+
+
+def test_small_body_is_classified():
+    receive, _ = receiver([json.dumps({"message": "Estoy muy triste"}).encode()])
+
+    _, body = asyncio.run(_read_body(receive))
+
+    assert _is_distress_request(body)
+
+
+def test_priority_requests_beyond_their_queue_wait_as_normal_requests():
+    async def scenario():
+        limiter = AdmissionLimiter("chat", limit=2, reserved=1, queue_size=2, priority_queue_size=1, max_wait=0.1)
+        assert await limiter.acquire(True) and await limiter.acquire(True)
+        return limiter, await asyncio.gather(*(limiter.acquire(True) for _ in range(4)))
+
+    limiter, admitted = asyncio.run(scenario())
+    stats = limiter.stats()
+
+    assert admitted == [False] * 4
+    assert stats["demoted_priority"] == 3
+    # One waited in the priority queue, two in the normal queue, one found it full
+    assert stats["rejected_timeout"] == 3
+    assert stats["rejected_queue_full"] == 1
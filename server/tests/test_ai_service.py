@@ -0,0 +1,80 @@
+import asyncio
+from types import SimpleNamespace
+from services.ai_service import run_tool_loop
+
+
+def call(name, **args):
+    return SimpleNamespace(function_call=SimpleNamespace(name=name, args=args))
+
+
+def turn(*parts, text=""):
+    return SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=list(parts)))], text=text)
+
+
+class StubChat:
+    """Replays scripted model turns and records what was sent back."""
+
+    def __init__(self, *turns):
+        self.turns = list(turns)
+        self.sent = []
+
+    async def send_message_async(self, message):
+        self.sent.append(message)
+        return self.turns.pop(0)
+
+
+class RecordingExecutor:
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = []
+
+    async def __call__(self, name, args):
+        self.calls.append((name, args))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+        return {"tool": name, "args": args}
+
+
+def test_parallel_calls_run_concurrently_and_reply_in_one_content():
+    chat = StubChat(
+        turn(
+            call("get_recent_moods_tool", limit=5),
+            call("list_calendar_events_tool", max_results=3),
+            call("create_calendar_event_tool", summary="Tutoría", start_time="2026-03-02T10:00:00", end_time="2026-03-02T11:00:00"),
+        ),
+        turn(text="Listo"),
+    )
+    execute = RecordingExecutor()
+
+    text, executed = asyncio.run(run_tool_loop(chat, "Hola", execute))
+
+    assert text == "Listo"
+    assert execute.max_in_flight == 3
+    assert [name for name, _ in executed] == ["get_recent_moods_tool", "list_calendar_events_tool", "create_calendar_event_tool"]
+    assert len(chat.sent) == 2
+    reply = chat.sent[1]
+    assert [part.function_response.name for part in reply.parts] == [name for name, _ in executed]
+    assert reply.parts[0].function_response.response["args"] == {"limit": 5}
+
+
+def test_text_answer_without_calls_executes_nothing():
+    chat = StubChat(turn(text="Buenos días"))
+    execute = RecordingExecutor()
+
+    assert asyncio.run(run_tool_loop(chat, "Hola", execute)) == ("Buenos días", [])
+    assert execute.calls == []
+
+
+def test_iteration_cap_returns_fallback_text():
+    chat = StubChat(*[turn(call("get_recent_moods_tool", limit=1), call("get_recent_moods_tool", limit=2)) for _ in range(3)])
+    execute = RecordingExecutor(delay=0)
+
+    text, executed = asyncio.run(run_tool_loop(chat, "Hola", execute, max_iterations=2))
+
+    assert text.startswith("Lo siento")
+    assert len(executed) == 4
+    assert len(chat.sent) == 3
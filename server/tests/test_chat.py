@@ -0,0 +1,33 @@
+import json
+import pytest
+from models.job import JobDB
+from routers import chat as chat_router
+
+
+@pytest.fixture
+def gemini(monkeypatch):
+    """Gemini configured, with the tool loop replaced by a fixed reply."""
+    async def run_tool_loop(chat, message, execute):
+        return "Respira hondo, lo estás haciendo bien.", []
+
+    monkeypatch.setattr(chat_router, "GOOGLE_API_KEY", "test-key")
+    monkeypatch.setattr(chat_router.genai, "GenerativeModel", lambda *args, **kwargs: type("Model", (), {"start_chat": lambda self: None})())
+    monkeypatch.setattr(chat_router, "run_tool_loop", run_tool_loop)
+
+
+def test_chat_turn_is_queued_for_indexing(client, db, gemini):
+    response = client.post("/api/chat", json={"message": "Tuve un día pesado"})
+
+    assert response.json() == {"response": "Respira hondo, lo estás haciendo bien."}
+    job = db.query(JobDB).filter(JobDB.kind == "vector_index.add").one()
+    assert json.loads(job.payload)["text"].startswith("Docente: Tuve un día pesado\nAsistente: Respira hondo")
+
+
+def test_indexing_failure_does_not_fail_the_reply(client, db, gemini, monkeypatch):
+    def broken(*args):
+        raise RuntimeError("database is locked")
+    monkeypatch.setattr(chat_router, "index_chat_turn", broken)
+
+    response = client.post("/api/chat", json={"message": "Tuve un día pesado"})
+
+    assert response.json() == {"response": "Respira hondo, lo estás haciendo bien."}
@@ -0,0 +1,171 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from models.job import JobDB
+from services import job_queue
+from services.job_queue import (
+    enqueue_job,
+    claim_next_job,
+    complete_job,
+    fail_job,
+    renew_lease,
+    process_next_job,
+    prune_finished_jobs,
+    register_job,
+    retry_delay,
+)
+
+
+def expire(db, job_id):
+    """Move a job's lease and retry time into the past."""
+    past = datetime.utcnow() - timedelta(seconds=1)
+    db.query(JobDB).filter(JobDB.id == job_id).update({JobDB.locked_until: past, JobDB.run_after: past})
+    db.commit()
+
+
+def claim_detached(db):
+    """Claim as a separate worker would: a snapshot of the job, not the session's shared instance."""
+    job = claim_next_job(db)
+    db.expunge(job)
+    return job
+
+
+def load(db, job_id):
+    db.expire_all()
+    return db.get(JobDB, job_id)
+
+
+def test_enqueue_is_idempotent(db):
+    first = enqueue_job(db, "test.noop", {"n": 1}, idempotency_key="same")
+    again = enqueue_job(db, "test.noop", {"n": 2}, idempotency_key="same")
+
+    assert again.id == first.id
+    assert db.query(JobDB).count() == 1
+
+
+def test_failed_job_is_requeued_when_enqueued_again(db):
+    job = enqueue_job(db, "test.noop", {}, idempotency_key="k", max_attempts=1)
+    fail_job(db, claim_next_job(db), "boom")
+
+    again = enqueue_job(db, "test.noop", {}, idempotency_key="k", max_attempts=1)
+
+    assert again.id == job.id
+    assert (again.status, again.attempts) == ("pending", 0)
+
+
+def test_backoff_then_failed_after_max_attempts(db):
+    job = enqueue_job(db, "test.noop", {}, max_attempts=3)
+
+    for attempt in (1, 2):
+        claimed = claim_next_job(db)
+        started = datetime.utcnow()
+        fail_job(db, claimed, f"error {attempt}")
+        db.refresh(job)
+        assert job.status == "pending"
+        assert job.run_after >= started + timedelta(seconds=retry_delay(attempt)) - timedelta(milliseconds=50)
+        assert claim_next_job(db) is None  # Not runnable before the backoff
+        expire(db, job.id)
+
+    fail_job(db, claim_next_job(db), "error 3")
+    db.refresh(job)
+    assert (job.status, job.attempts, job.last_error) == ("failed", 3, "error 3")
+    assert retry_delay(2) == 2 * retry_delay(1)
+
+
+def test_expired_lease_is_reclaimed(db):
+    job = enqueue_job(db, "test.noop", {})
+    first = claim_detached(db)
+    assert claim_next_job(db) is None  # Leased
+
+    expire(db, job.id)
+    second = claim_detached(db)
+
+    assert second.id == job.id
+    assert (second.attempts, second.lease) == (2, first.lease + 1)
+
+
+def test_expired_lease_on_last_attempt_fails_the_job(db):
+    job = enqueue_job(db, "test.noop", {}, max_attempts=1)
+    claim_next_job(db)
+    expire(db, job.id)
+
+    assert claim_next_job(db) is None
+    db.refresh(job)
+    assert job.status == "failed"
+
+
+def test_stale_worker_cannot_finish_or_renew(db):
+    job_id = enqueue_job(db, "test.noop", {}).id
+    stale = claim_detached(db)
+    expire(db, job_id)
+    current = claim_detached(db)
+
+    complete_job(db, stale, {"from": "stale"})
+    assert not renew_lease(db, stale)
+    assert load(db, job_id).status == "running"
+
+    assert renew_lease(db, current)
+    complete_job(db, current, {"from": "current"})
+    job = load(db, job_id)
+    assert (job.status, job.result) == ("succeeded", '{"from": "current"}')
+
+
+def test_requeued_job_does_not_accept_an_old_lease(db):
+    job_id = enqueue_job(db, "test.noop", {}, idempotency_key="k", max_attempts=1).id
+    stale = claim_detached(db)
+    expire(db, job_id)
+    assert claim_next_job(db) is None  # Fails it: the expired lease was its last attempt
+    enqueue_job(db, "test.noop", {}, idempotency_key="k", max_attempts=1)
+    current = claim_detached(db)
+    assert current.attempts == stale.attempts == 1
+
+    complete_job(db, stale, {"from": "stale"})
+
+    assert load(db, job_id).status == "running"
+
+
+def test_slow_handler_keeps_its_lease(db, monkeypatch):
+    monkeypatch.setattr(job_queue, "JOB_VISIBILITY_TIMEOUT_SECONDS", 0.3)
+    runs = []
+
+    @register_job("test.slow")
+    async def slow(payload):
+        runs.append(1)
+        await asyncio.sleep(0.8)
+        return {"done": True}
+
+    job = enqueue_job(db, "test.slow", {})
+
+    async def scenario():
+        worker = asyncio.create_task(process_next_job())
+        await asyncio.sleep(0.05)
+        others = 0
+        for _ in range(8):
+            await asyncio.sleep(0.1)
+            others += await process_next_job()
+        return await worker, others
+
+    assert asyncio.run(scenario()) == (True, 0)
+    db.refresh(job)
+    assert (job.status, job.attempts, len(runs)) == ("succeeded", 1, 1)
+
+
+def test_prune_finished_jobs(db):
+    old, recent, pending = (enqueue_job(db, "test.noop", {"text": "nota"}) for _ in range(3))
+    for job in (old, recent):
+        complete_job(db, claim_next_job(db), None)
+    db.query(JobDB).filter(JobDB.id == old.id).update({JobDB.updated_at: datetime.utcnow() - timedelta(days=8)})
+    db.commit()
+
+    assert prune_finished_jobs(db, days=7) == 1
+    assert {j.id for j in db.query(JobDB)} == {recent.id, pending.id}
+
+
+def test_job_status_is_only_visible_to_its_owner(client, db):
+    client.post("/api/register", json={"username": "bea", "password": "secret", "email": "bea@school.test"})
+    bea = client.post("/api/token", data={"username": "bea", "password": "secret"}).json()["access_token"]
+    job = enqueue_job(db, "test.noop", {}, user_id=1)
+
+    assert client.get(f"/api/jobs/{job.id}").json()["status"] == "pending"
+    assert client.get(f"/api/jobs/{job.id}", headers={"Authorization": f"Bearer {bea}"}).status_code == 404
+    assert client.get("/api/jobs/9999").status_code == 404
@@ -0,0 +1,99 @@
+import json
+import pytest
+from models.job import JobDB
+from models.mood import MoodEntryDB
+from models.wellbeing import MoodBucketDB
+from services import vector_index
+from services.wellbeing_aggregates import TOTAL
+
+
+def entry(client_id, mood="calm", timestamp="2026-03-02T10:00:00", note=None):
+    return {"client_id": client_id, "mood": mood, "timestamp": timestamp, "note": note}
+
+
+def daily_total(db):
+    return db.query(MoodBucketDB.entry_count).filter(MoodBucketDB.granularity == "day", MoodBucketDB.mood == TOTAL).scalar()
+
+
+def test_retried_batch_creates_nothing_new(client, db):
+    batch = {"entries": [entry("a"), entry("b", "sad"), entry("c", "happy")]}
+
+    first = client.post("/api/mood/batch", json=batch).json()
+    retry = client.post("/api/mood/batch", json=batch).json()
+
+    assert first["created"] == 3 and first["duplicates"] == 0
+    assert retry["created"] == 0 and retry["duplicates"] == 3
+    assert [r["id"] for r in retry["results"]] == [r["id"] for r in first["results"]]
+    assert db.query(MoodEntryDB).count() == 3
+    assert daily_total(db) == 3  # Aggregates are not counted twice
+
+
+def test_partially_synced_batch_only_creates_new_entries(client, db):
+    client.post("/api/mood/batch", json={"entries": [entry("a")]})
+
+    result = client.post("/api/mood/batch", json={"entries": [entry("a"), entry("b")]}).json()
+
+    assert [(r["client_id"], r["status"]) for r in result["results"]] == [("a", "duplicate"), ("b", "created")]
+    assert db.query(MoodEntryDB).count() == 2
+
+
+def test_duplicate_client_ids_within_a_batch(client, db):
+    batch = {"entries": [entry("a", "happy"), entry("a", "sad"), entry("b")]}
+
+    result = client.post("/api/mood/batch", json=batch).json()
+
+    assert result["created"] == 2 and result["duplicates"] == 1
+    first, repeated, _ = result["results"]
+    assert first["status"] == "created" and repeated["status"] == "duplicate"
+    assert repeated["id"] == first["id"]
+    # First occurrence wins
+    assert db.query(MoodEntryDB.mood).filter(MoodEntryDB.client_id == "a").scalar() == "happy"
+
+
+def test_tz_aware_timestamps_are_stored_as_naive_utc(client, db):
+    batch = {"entries": [entry("a", timestamp="2026-03-02T23:30:00-05:00"), entry("b", timestamp="2026-03-02T10:00:00Z")]}
+
+    client.post("/api/mood/batch", json=batch)
+
+    stored = dict(db.query(MoodEntryDB.client_id, MoodEntryDB.timestamp).all())
+    assert stored["a"].isoformat() == "2026-03-03T04:30:00"
+    assert stored["b"].isoformat() == "2026-03-02T10:00:00"
+    # Bucketed by the UTC day
+    days = {b.bucket_start.day for b in db.query(MoodBucketDB).filter(MoodBucketDB.granularity == "day")}
+    assert days == {2, 3}
+
+
+def test_client_ids_are_scoped_per_user(client, db):
+    client.post("/api/mood/batch", json={"entries": [entry("a")]})
+    client.post("/api/register", json={"username": "bea", "password": "secret", "email": "bea@school.test"})
+    token = client.post("/api/token", data={"username": "bea", "password": "secret"}).json()["access_token"]
+
+    result = client.post("/api/mood/batch", json={"entries": [entry("a")]}, headers={"Authorization": f"Bearer {token}"}).json()
+
+    assert result["created"] == 1
+
+
+def test_notes_are_queued_for_indexing_with_their_entries(client, db):
+    batch = {"entries": [entry("a", note="Reunión difícil"), entry("b"), entry("c", note="  ")]}
+
+    first = client.post("/api/mood/batch", json=batch).json()
+    client.post("/api/mood/batch", json=batch)
+
+    note_id = first["results"][0]["id"]
+    job, = db.query(JobDB).filter(JobDB.kind == "vector_index.add").all()
+    assert job.idempotency_key == f"vector_index.mood:{note_id}"
+    assert json.loads(job.payload)["text"] == "Ánimo calm: Reunión difícil"
+
+
+def test_entries_are_not_committed_without_their_indexing_jobs(client, db, monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError("database went away")
+
+    monkeypatch.setattr(vector_index, "add_jobs", fail)
+    with pytest.raises(RuntimeError):
+        client.post("/api/mood/batch", json={"entries": [entry("a", note="Cansada")]})
+    with pytest.raises(RuntimeError):
+        client.post("/api/mood", json={"mood": "sad", "note": "Cansada"})
+
+    assert db.query(MoodEntryDB).count() == 0
+    assert daily_total(db) is None
@@ -0,0 +1,82 @@
+from datetime import datetime, timezone
+import numpy as np
+import pytest
+from benchmarks.bench_mood_insights import assert_close, python_insights, synthetic_history
+from services.mood_insights import MOOD_CODES, compute_insights
+
+
+def history(*entries):
+    """(mood, ISO UTC timestamp) pairs as the arrays load_mood_arrays returns."""
+    codes = np.array([MOOD_CODES[mood] for mood, _ in entries], dtype=np.int8)
+    epochs = np.array(
+        [int(datetime.fromisoformat(ts).replace(tzinfo=timezone.utc).timestamp()) for _, ts in entries],
+        dtype=np.int64,
+    )
+    return codes, epochs
+
+
+def test_empty_history():
+    result = compute_insights(np.empty(0, dtype=np.int8), np.empty(0, dtype=np.int64))
+
+    assert result["total_entries"] == 0
+    assert result["average_score"] is None
+    assert set(result["distribution"].values()) == {0}
+    assert result["weekly"] == result["by_weekday"] == result["daily_moving_average"] == []
+    assert result["stress_streaks"] == {"current": 0, "longest": 0}
+
+
+def test_stress_streaks():
+    result = compute_insights(*history(
+        ("stressed", "2026-03-02T08:00:00"),
+        ("exhausted", "2026-03-02T12:00:00"),
+        ("stressed", "2026-03-02T18:00:00"),
+        ("happy", "2026-03-03T08:00:00"),
+        ("stressed", "2026-03-03T18:00:00"),
+        ("exhausted", "2026-03-04T08:00:00"),
+    ))
+
+    assert result["stress_streaks"] == {"current": 2, "longest": 3}
+
+
+def test_weekday_and_time_of_day_buckets():
+    result = compute_insights(*history(
+        ("happy", "2026-03-02T09:00:00"),  # Monday morning
+        ("sad", "2026-03-02T20:00:00"),  # Monday evening
+        ("stressed", "2026-03-08T14:00:00"),  # Sunday afternoon
+    ))
+
+    by_weekday = {b["bucket"]: b for b in result["by_weekday"]}
+    assert by_weekday["monday"]["entries"] == 2
+    assert by_weekday["monday"]["average_score"] == pytest.approx((2.0 - 1.5) / 2)
+    assert by_weekday["sunday"]["stress_ratio"] == 1.0
+    assert by_weekday["tuesday"]["entries"] == 0
+    assert {b["bucket"]: b["entries"] for b in result["by_time_of_day"]} == {
+        "night": 0, "morning": 1, "afternoon": 1, "evening": 1,
+    }
+    assert [w["week_start"] for w in result["weekly"]] == ["2026-03-02"]
+
+
+def test_timezone_offset_shifts_days_and_hours():
+    entries = history(("calm", "2026-03-03T02:00:00"))  # Tuesday night in UTC
+
+    utc = compute_insights(*entries)
+    santiago = compute_insights(*entries, tz_offset_minutes=-180)  # Monday 23:00 locally
+
+    assert utc["by_weekday"][1]["entries"] == 1 and utc["by_time_of_day"][0]["entries"] == 1
+    assert santiago["by_weekday"][0]["entries"] == 1 and santiago["by_time_of_day"][3]["entries"] == 1
+    assert santiago["daily_moving_average"][0]["date"] == "2026-03-02"
+
+
+@pytest.mark.parametrize("tz_offset_minutes", [0, -300, 330])
+def test_matches_pure_python_implementation(tz_offset_minutes):
+    codes, epochs = synthetic_history(3000)
+
+    assert_close(
+        compute_insights(np.array(codes, dtype=np.int8), np.array(epochs, dtype=np.int64), tz_offset_minutes),
+        python_insights(codes, epochs, tz_offset_minutes),
+    )
+
+
+def test_insights_endpoint_validates_the_offset(client):
+    assert client.get("/api/mood/insights?tz_offset_minutes=99999999999999999").status_code == 422
+    assert client.get("/api/mood/insights?tz_offset_minutes=840").status_code == 200
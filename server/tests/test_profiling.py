@@ -0,0 +1,76 @@
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+import services.auth_service
+from database import get_db
+from middleware import profiling
+from middleware.profiling import ProfilingMiddleware
+
+
+@pytest.fixture
+def profiled(db, monkeypatch):
+    """A small app behind ProfilingMiddleware, with PROFILING_TOKEN set and no stored profiles."""
+    monkeypatch.setattr(profiling, "PROFILING_TOKEN", "s3cret")
+    monkeypatch.setattr(profiling, "state", profiling.ProfilingState())
+    profiling.records.clear()
+
+    app = FastAPI()
+
+    @app.get("/api/moods")
+    def moods(db: Session = Depends(get_db)):
+        return {"count": db.execute(text("SELECT count(*) FROM mood_entries")).scalar()}
+
+    app.add_middleware(ProfilingMiddleware)
+    yield TestClient(app)
+    profiling.records.clear()
+
+
+def test_matching_token_records_the_request_with_its_sql(profiled):
+    response = profiled.get("/api/moods", headers={"X-Profile-Token": "s3cret"})
+
+    record, = profiling.records
+    assert response.headers["x-profile-id"] == record["id"]
+    assert (record["path"], record["status"]) == ("/api/moods", 200)
+    assert record["sql_count"] == 1
+    assert "FROM mood_entries" in record["sql"][0]["statement"]
+
+
+def test_wrong_token_and_disabled_toggle_record_nothing(profiled):
+    assert "x-profile-id" not in profiled.get("/api/moods", headers={"X-Profile-Token": "guess"}).headers
+    profiled.get("/api/moods")
+
+    # Sampling everything still needs the admin toggle
+    profiling.state.sample_rate, profiling.state.path_prefix = 1.0, "/api"
+    profiled.get("/api/moods")
+
+    assert not profiling.records
+
+
+def test_requests_beyond_the_concurrency_cap_run_unprofiled(profiled, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILING_MAX_CONCURRENT", 1)
+    assert profiling._try_attach()  # Another profiled request is in flight
+    try:
+        response = profiled.get("/api/moods", headers={"X-Profile-Token": "s3cret"})
+    finally:
+        profiling._detach()
+
+    assert response.status_code == 200
+    assert not profiling.records
+    profiled.get("/api/moods", headers={"X-Profile-Token": "s3cret"})
+    assert len(profiling.records) == 1
+
+
+@pytest.mark.parametrize("path, admin_status", [
+    ("/api/admin/profiling", 200),
+    ("/api/admin/profiles", 200),
+    ("/api/admin/profiles/abc", 404),
+    ("/api/admin/profiles/abc/flamegraph", 404),
+])
+def test_profiling_endpoints_require_an_admin(client, monkeypatch, path, admin_status):
+    assert client.get(path).status_code == 403
+    assert client.get(path, headers={"Authorization": ""}).status_code == 401
+
+    monkeypatch.setattr(services.auth_service, "ADMIN_EMAILS", ["ana@school.test"])
+    assert client.get(path).status_code == admin_status
@@ -0,0 +1,101 @@
+import time
+from datetime import datetime, timedelta
+import jose.jwt
+import pytest
+from jose import JWTError
+import services.auth_service
+from services.auth_service import create_access_token
+from services.token_cache import TokenCache
+
+
+def token_for(sub):
+    return create_access_token({"sub": sub}, expires_delta=timedelta(minutes=5))
+
+
+def test_revoke_subject_rejects_tokens_from_earlier_seconds(monkeypatch):
+    cache = TokenCache()
+    old = token_for("ana")
+    cache.decode(old)
+
+    issued = int(time.time())
+    monkeypatch.setattr(time, "time", lambda: issued + 1.9)
+    cache.revoke_subject("ana")
+
+    with pytest.raises(JWTError):
+        cache.decode(old)
+
+
+def test_token_issued_in_the_revocation_second_stays_valid(monkeypatch):
+    cache = TokenCache()
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now)
+    cache.revoke_subject("ana")
+
+    # Logging in again right after a password change, within the same second
+    assert cache.decode(token_for("ana"))["sub"] == "ana"
+
+
+def test_revoke_token_only_affects_that_token():
+    cache = TokenCache()
+    first, second = token_for("ana"), token_for("ana")
+    cache.decode(first)
+    cache.revoke_token(first)
+
+    with pytest.raises(JWTError):
+        cache.decode(first)
+    assert cache.decode(second)["sub"] == "ana"
+
+
+def test_cached_token_is_rejected_once_exp_passes(monkeypatch):
+    cache = TokenCache()
+    token = token_for("ana")
+    exp = cache.decode(token)["exp"]
+    assert cache.hits == 0 and cache.decode(token)["sub"] == "ana" and cache.hits == 1
+
+    class Later(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime.fromtimestamp(exp + 1, tz)
+
+    monkeypatch.setattr(time, "time", lambda: exp + 1)
+    monkeypatch.setattr(jose.jwt, "datetime", Later)
+    with pytest.raises(JWTError):
+        cache.decode(token)
+    assert cache.stats()["size"] == 0
+
+
+def test_logout_on_another_worker_is_seen_after_the_check_ttl(db, monkeypatch):
+    this_worker, other_worker = TokenCache(check_ttl=5), TokenCache(check_ttl=5)
+    token = token_for("ana")
+    other_worker.decode(token, db)
+
+    this_worker.revoke_token(token, this_worker.decode(token)["exp"], db)
+    db.commit()
+    # Within the TTL the other worker still trusts its cached check
+    assert other_worker.decode(token, db)["sub"] == "ana"
+
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 6)
+    with pytest.raises(JWTError):
+        other_worker.decode(token, db)
+
+
+def test_password_change_revokes_tokens_on_every_worker(client, monkeypatch):
+    old_token = client.headers["Authorization"]
+    later = int(time.time()) + 1.5
+
+    class Later(datetime):
+        @classmethod
+        def utcnow(cls):
+            return datetime.utcfromtimestamp(later)
+
+    monkeypatch.setattr(time, "time", lambda: later)
+    monkeypatch.setattr(services.auth_service, "datetime", Later)
+    response = client.put("/api/users/me/password", json={"current_password": "secret", "new_password": "nueva"})
+    assert response.status_code == 200
+
+    # A worker that never saw the change in memory still rejects the old token
+    monkeypatch.setattr(services.auth_service, "token_cache", TokenCache())
+    assert client.get("/api/users/me", headers={"Authorization": old_token}).status_code == 401
+    new_token = f"Bearer {response.json()['access_token']}"
+    assert client.get("/api/users/me", headers={"Authorization": new_token}).status_code == 200
@@ -0,0 +1,117 @@
+from datetime import datetime
+import numpy as np
+import pytest
+from models.mood import MoodEntryDB
+from services import vector_index
+from services.vector_index import HashingEmbedder, UserVectorIndex, _normalize
+from config import CHAT_CONTEXT_MAX_CHARS
+
+
+@pytest.fixture
+def index(tmp_path):
+    return UserVectorIndex(1, HashingEmbedder(), directory=str(tmp_path))
+
+
+def add(index, *texts):
+    index.add(list(texts), [{"kind": "mood", "timestamp": None} for _ in texts])
+
+
+def test_append_after_crash_between_vector_and_offset_writes(index):
+    add(index, "reunión con apoderados muy tensa")
+    # Crash after the second row's metadata and vector were written, before its offset
+    with open(index.meta_path, "ab") as meta:
+        meta.write(b'{"kind": "mood", "text": "fila perdida"}\n')
+    with open(index.vectors_path, "ab") as vectors:
+        vectors.write(_normalize(index.embedder.embed(["fila perdida"]))[0].tobytes())
+
+    add(index, "taller de respiración con el curso")
+
+    assert len(index) == 2
+    top = index.search("taller de respiración con el curso", k=1)[0]
+    assert top["text"] == "taller de respiración con el curso"
+    assert top["score"] == pytest.approx(1.0)
+    assert [s["text"] for s in index.search("fila perdida", k=5)] != ["fila perdida"]
+
+
+def test_append_after_crash_after_metadata_write(index):
+    add(index, "corrección de pruebas hasta tarde")
+    with open(index.meta_path, "ab") as meta:
+        meta.write(b'{"kind": "mood", "te')
+
+    add(index, "paseo al parque el fin de semana")
+
+    offsets = np.fromfile(index.offsets_path, dtype=np.int64)
+    with open(index.meta_path, "rb") as meta:
+        lines = meta.read().splitlines()
+    assert len(offsets) == len(lines) == 2
+    assert index.search("paseo al parque el fin de semana", k=1)[0]["text"] == "paseo al parque el fin de semana"
+
+
+def test_search_orders_by_similarity(index):
+    add(
+        index,
+        "Me siento agotada por la corrección de pruebas",
+        "Buen día, la clase de ciencias salió excelente",
+        "Conflicto con un apoderado en la reunión",
+    )
+
+    results = index.search("reunión difícil con apoderado", k=3)
+
+    assert results[0]["text"] == "Conflicto con un apoderado en la reunión"
+    assert [r["score"] for r in results] == sorted((r["score"] for r in results), reverse=True)
+
+
+def test_search_truncates_to_k(index):
+    add(index, *[f"nota número {i} sobre el curso" for i in range(10)])
+
+    assert len(index.search("curso", k=3)) == 3
+    assert len(index.search("curso", k=50)) == 10
+    assert index.search("curso", k=0) == []
+
+
+def test_empty_index_returns_nothing(index):
+    assert len(index) == 0
+    assert index.search("cualquier cosa") == []
+
+
+def test_personal_context_is_bounded(index, monkeypatch):
+    monkeypatch.setattr(vector_index, "get_user_index", lambda user_id: index)
+    index.add(
+        [f"pruebas {i} " + "x" * 1000 for i in range(8)],
+        [{"kind": "mood", "timestamp": f"2026-03-0{i + 1}T10:00:00"} for i in range(8)],
+    )
+
+    context = vector_index.build_personal_context(1, "pruebas", k=3)
+
+    header, *lines = context.splitlines()
+    assert header.startswith("Recuerdos relevantes")
+    assert len(lines) == 3
+    for line in lines:
+        assert line.startswith("- (2026-03-0")
+        assert len(line) <= len("- (2026-03-01) ") + CHAT_CONTEXT_MAX_CHARS
+
+
+def test_personal_context_empty_without_snippets(index, monkeypatch):
+    monkeypatch.setattr(vector_index, "get_user_index", lambda user_id: index)
+
+    assert vector_index.build_personal_context(1, "hola") == ""
+
+
+def test_rebuild_reindexes_mood_notes_from_the_database(db, index, monkeypatch):
+    monkeypatch.setattr(vector_index, "get_user_index", lambda user_id: index)
+    db.add_all([
+        MoodEntryDB(user_id=1, mood="stressed", note="Evaluación docente mañana", timestamp=datetime(2026, 3, 2, 9)),
+        MoodEntryDB(user_id=1, mood="happy", note="  ", timestamp=datetime(2026, 3, 3, 9)),
+        MoodEntryDB(user_id=1, mood="calm", note=None, timestamp=datetime(2026, 3, 4, 9)),
+        MoodEntryDB(user_id=2, mood="sad", note="Nota de otra persona", timestamp=datetime(2026, 3, 5, 9)),
+    ])
+    db.commit()
+    add(index, "fila que no viene de la base de datos")
+
+    assert vector_index.rebuild_user_index(db, 1, batch_size=1) == 1
+
+    assert len(index) == 1
+    top, = index.search("evaluación docente", k=5)
+    assert top["text"] == "Ánimo stressed: Evaluación docente mañana"
+    assert top["timestamp"] == "2026-03-02T09:00:00"
+    assert sorted(vector_index.users_with_notes(db)) == [1, 2]
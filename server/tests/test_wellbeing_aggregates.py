@@ -0,0 +1,140 @@
+from datetime import datetime
+from models.mood import MoodEntryDB
+from models.user import UserDB
+from models.wellbeing import MoodBucketDB, MoodBucketContributorDB
+from services.wellbeing_aggregates import (
+    TOTAL,
+    record_mood_entry,
+    rebuild_mood_buckets,
+    get_wellbeing_dashboard,
+    prune_bucket_contributors,
+)
+
+DAY_START = datetime(2026, 3, 2)
+DAY_END = datetime(2026, 3, 3)
+
+
+def make_users(db, n):
+    users = [UserDB(username=f"teacher{i}", email=f"teacher{i}@school.test") for i in range(n)]
+    db.add_all(users)
+    db.commit()
+    return users
+
+
+def log(db, users, mood, hour=10):
+    for user in users:
+        record_mood_entry(db, user.id, mood, DAY_START.replace(hour=hour))
+    db.commit()
+
+
+def test_single_rare_mood_cannot_be_recovered_by_subtraction(db):
+    users = make_users(db, 7)
+    log(db, users[:6], "happy")
+    log(db, users[6:], "sad")
+
+    bucket, = get_wellbeing_dashboard(db, "day", DAY_START, DAY_END, k=5)["buckets"]
+
+    assert not bucket["suppressed"]
+    assert bucket["entries"] == 7
+    # Showing happy=6 would reveal sad = 7 - 6 = 1, and a sad key would reveal it was logged at all
+    assert bucket["moods"] == {}
+
+
+def test_complementary_cell_is_the_smallest_safe_one(db):
+    users = make_users(db, 17)
+    log(db, users[:10], "happy")
+    log(db, users[10:16], "calm")
+    log(db, users[16:], "sad")
+
+    bucket, = get_wellbeing_dashboard(db, "day", DAY_START, DAY_END, k=5)["buckets"]
+
+    assert bucket["entries"] == 17
+    assert bucket["moods"] == {"happy": 10}
+
+
+def test_groups_at_threshold_are_not_suppressed(db):
+    users = make_users(db, 10)
+    log(db, users[:5], "happy")
+    log(db, users[5:], "sad")
+
+    bucket, = get_wellbeing_dashboard(db, "day", DAY_START, DAY_END, k=5)["buckets"]
+
+    assert bucket["moods"] == {"happy": 5, "sad": 5}
+
+
+def test_hourly_buckets_cannot_be_recovered_from_the_daily_total(db):
+    users = make_users(db, 7)
+    log(db, users[:6], "happy", hour=10)
+    log(db, users[6:], "happy", hour=15)
+
+    daily, = get_wellbeing_dashboard(db, "day", DAY_START, DAY_END, k=5)["buckets"]
+    hourly = get_wellbeing_dashboard(db, "hour", DAY_START, DAY_END, k=5)["buckets"]
+
+    assert daily["entries"] == 7
+    # Showing 6 entries at 10:00 would reveal the single entry at 15:00
+    assert [b["suppressed"] for b in hourly] == [True, True]
+
+
+def test_hourly_mood_cells_are_protected_against_daily_mood_totals(db):
+    users = make_users(db, 12)
+    log(db, users[:6], "happy", hour=10)
+    log(db, users[6:11], "happy", hour=15)
+    log(db, users[11:], "sad", hour=15)
+    log(db, users[:5], "calm", hour=15)
+
+    hourly = get_wellbeing_dashboard(db, "hour", DAY_START, DAY_END, k=5)["buckets"]
+    by_hour = {b["bucket_start"].hour: b for b in hourly}
+
+    # calm only occurs at 15:00, so hiding it would not help (it equals the daily calm count):
+    # happy is the complement at 15:00, and then at 10:00 too or the daily happy count reveals it
+    assert by_hour[15]["moods"] == {"calm": 5}
+    assert by_hour[10]["moods"] == {}
+    assert not by_hour[10]["suppressed"] and not by_hour[15]["suppressed"]
+
+
+def test_partial_day_range_still_uses_whole_days(db):
+    users = make_users(db, 7)
+    log(db, users[:6], "happy", hour=10)
+    log(db, users[6:], "happy", hour=15)
+
+    hourly = get_wellbeing_dashboard(db, "hour", DAY_START.replace(hour=9), DAY_START.replace(hour=12), k=5)["buckets"]
+
+    assert [(b["bucket_start"].hour, b["suppressed"]) for b in hourly] == [(10, True)]
+
+
+def test_rebuild_keeps_buckets_of_archived_months(db):
+    users = make_users(db, 2)
+    # January's raw entries were archived: only its buckets remain
+    record_mood_entry(db, users[0].id, "sad", datetime(2026, 1, 15, 9))
+    db.add(MoodEntryDB(user_id=users[1].id, mood="calm", timestamp=datetime(2026, 3, 2, 10)))
+    record_mood_entry(db, users[1].id, "happy", datetime(2026, 3, 9, 10))  # Stale: no raw entry
+    db.commit()
+
+    cells, since = rebuild_mood_buckets(db)
+
+    assert since == datetime(2026, 3, 2)
+    assert cells == 4  # calm and total, hourly and daily
+    kept = {(b.bucket_start, b.mood) for b in db.query(MoodBucketDB).filter(MoodBucketDB.granularity == "day")}
+    assert kept == {
+        (datetime(2026, 1, 15), "sad"), (datetime(2026, 1, 15), TOTAL),
+        (datetime(2026, 3, 2), "calm"), (datetime(2026, 3, 2), TOTAL),
+    }
+
+
+def test_pruning_contributors_freezes_counts_of_old_buckets(db):
+    users = make_users(db, 5)
+    log(db, users, "calm")
+    today = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    record_mood_entry(db, users[0].id, "calm", today)
+    db.commit()
+
+    deleted = prune_bucket_contributors(db)
+
+    # March's rows are gone (calm and total, hourly and daily, for 5 users); today's are kept
+    assert deleted == 20
+    assert {row.bucket_start for row in db.query(MoodBucketContributorDB)} == {today, today.replace(hour=0)}
+    # A late offline sync from a returning teacher must not look like a sixth contributor
+    log(db, users[:1], "calm")
+    total = db.query(MoodBucketDB).filter_by(granularity="day", bucket_start=DAY_START, mood=TOTAL).one()
+    assert (total.entry_count, total.contributor_count, total.contributors_pruned) == (6, 5, True)
+    assert db.query(MoodBucketContributorDB).count() == 4